@@ -0,0 +1,160 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+# IDW (internal data width) sizing without synthesis iterations, see "Bin
+# overflows" in ../README.md. The models don't saturate, so one run for the
+# given stimulus gives every value that appears in the places where the RTL
+# saturates or truncates to IDW:
+#
+#   default (../rtl/sdft_default.sv) : y_comb_re = y_prev_re + comb  (comb_sat)
+#                                      y_re, y_im rotator outputs     (product_mem)
+#   rl      (../rtl/sdft_rl.sv)      : y = comb + y_z1_2cos - y_z2    (y_sat)
+#                                      fd_real = y_cos - y_z1         (fd_real_sat)
+#                                      fd_imag = y_sin                (truncated)
+#
+# For each of them per-bin peak magnitude and the histogram of signed bit
+# lengths are collected. The histogram answers for all IDW candidates at once:
+# events( IDW ) is the number of values longer than IDW bits. The smallest IDW
+# with zero events is exact. With a nonzero target rate it's an estimate: once
+# saturation happens the real trajectory differs from the unsaturated one.
+#
+#   python3 bitwidth_explorer.py [default|rl] [N] [DW] [CW] [target_rate]
+
+import numpy as np
+import sys
+from models import DelayLine
+from models import SdftInt
+from models import SdftIntRL
+
+MAX_BITS = 72
+
+# Signed bit length, i.e. the smallest b such that -2**(b-1) <= v < 2**(b-1).
+# Values are integers in doubles, frexp() exponent is the bit length of |v|
+def signed_bits( v ):
+    return np.frexp( np.where( v >= 0, v, -v-1 ) )[1] + 1
+
+
+class BitwidthExplorer:
+    def __init__( self, N, bitwidth=32, architecture='default', chunk=4096 ):
+        if( architecture not in { 'default', 'rl' } ):
+            print( "BitwidthExplorer : architecture could be either 'default' or 'rl'" )
+            exit()
+        self.N            = N
+        self.architecture = architecture
+        self.chunk        = chunk
+        self.x            = DelayLine( N )
+        self.samples      = 0
+        if( architecture == 'default' ):
+            self.sdft   = SdftInt( N, bitwidth )
+            self.points = [ "comb_sat", "product_mem_re", "product_mem_im" ]
+        else:
+            self.sdft   = SdftIntRL( N, bitwidth )
+            self.points = [ "y_sat", "fd_real_sat", "fd_imag" ]
+        self.peak = { p : np.zeros( N ) for p in self.points }
+        self.hist = { p : np.zeros( MAX_BITS+1, dtype=np.int64 ) for p in self.points }
+
+    def record( self, point, v ):
+        np.maximum( self.peak[point], np.abs( v ).max( axis=0 ), out=self.peak[point] )
+        self.hist[point] += np.bincount( signed_bits( v ).ravel(), minlength=MAX_BITS+1 )
+
+    # Samples are truncated to integers, as test scripts write them for RTL
+    def run( self, x ):
+        x = np.trunc( np.asarray( x ) ).astype( np.int64 )
+        for t in range( 0, len(x), self.chunk ):
+            self.run_chunk( x[t:t+self.chunk] )
+        return self
+
+    def run_chunk( self, x ):
+        comb = x - self.x.block( x )
+        if( self.architecture == 'default' ):
+            y_prev = self.sdft.y_prev
+            y      = self.sdft.process( x )
+            y_prev = np.concatenate( ( y_prev[None,:], y[:-1] ) )
+            self.record( "comb_sat",       y_prev.real + comb[:,None] )
+            self.record( "product_mem_re", y.real )
+            self.record( "product_mem_im", y.imag )
+        else:
+            y_out = np.zeros( ( len(x), self.N ), dtype=complex )
+            y     = np.zeros( ( len(x), self.N ) )
+            for t in range( len(x) ):
+                self.sdft.step( comb[t], y_out[t] )
+                y[t] = self.sdft.y_z1 # just computed resonator output
+            self.record( "y_sat",       y )
+            self.record( "fd_real_sat", y_out.real )
+            self.record( "fd_imag",     y_out.imag )
+        self.samples += len(x)
+
+    # Number of values that don't fit idw bits, for every idw = [0:MAX_BITS]
+    def events( self, point=None ):
+        points = self.points if( point is None ) else [ point ]
+        hist   = sum( self.hist[p] for p in points )
+        return np.cumsum( hist[::-1] )[::-1][1:].tolist() + [ 0 ]
+
+    def min_idw( self, target_rate=0., point=None ):
+        total  = self.samples * self.N * ( len( self.points ) if( point is None ) else 1 )
+        events = self.events( point )
+        for idw in range( MAX_BITS+1 ):
+            if( events[idw] <= target_rate * total ):
+                return idw
+
+    def bits( self, point ):
+        return signed_bits( self.peak[point] )
+
+
+if __name__ == "__main__":
+    ARCHITECTURE = sys.argv[1] if( len( sys.argv ) > 1 ) else "default"
+    N            = int( sys.argv[2] ) if( len( sys.argv ) > 2 ) else 256
+    DW           = int( sys.argv[3] ) if( len( sys.argv ) > 3 ) else 16
+    CW           = int( sys.argv[4] ) if( len( sys.argv ) > 4 ) else 16
+    TARGET_RATE  = float( sys.argv[5] ) if( len( sys.argv ) > 5 ) else 1e-6
+    T            = N * 30
+
+    # Stimulus as in ../tb/sdft/test.py. A full scale sine right in the bin
+    # center is the worst case for that bin (it grows up to N/2 * amplitude)
+    min_val = -2**(DW-1)
+    max_val =  2**(DW-1)-1
+    rng     = np.random.default_rng( 1 )
+    stimulus = {
+      "noise" : np.clip( rng.normal( 0.0, max_val / 8, T ), min_val, max_val ),
+      "sine"  : np.round( max_val * np.cos( 2 * np.pi * ( N//8 ) * np.arange(T) / N ) )
+    }
+
+    print( f"{ARCHITECTURE}, N = {N}, DW = {DW}, CW = {CW}, {T} samples" )
+    for name, x in stimulus.items():
+        e = BitwidthExplorer( N, CW, ARCHITECTURE ).run( x )
+        print( f"\n{name} stimulus" )
+        print( "  %-16s %10s %12s %12s" % ( "point", "max bits", "zero sat IDW", "target IDW" ) )
+        for p in e.points:
+            print( "  %-16s %10d %12d %12d" % ( p, e.bits(p).max(), e.min_idw( 0., p ),
+                                               e.min_idw( TARGET_RATE, p ) ) )
+        idw    = e.min_idw()
+        events = e.events()
+        print( "  IDW for zero saturation : %d" % idw )
+        print( "  IDW for rate <= %g : %d" % ( TARGET_RATE, e.min_idw( TARGET_RATE ) ) )
+        print( "  events by IDW : " + ", ".join( "%d:%d" % ( b, events[b] )
+                                                 for b in range( max( 1, idw-4 ), idw+1 ) ) )
+        print( "  resonator RAM : %d bits, multipliers : %d x ( %d x %d )" %
+               ( 2 * idw * N, 4 if( ARCHITECTURE=="default" ) else 3, idw, CW ) )
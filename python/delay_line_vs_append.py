@@ -0,0 +1,86 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+# Per-sample cost of the comb filter delay line: np.append (shift the whole
+# history by one sample) versus circular DelayLine from models.py. Allocation
+# count is the number of samples that made numpy allocate at least N elements,
+# measured with tracemalloc in a separate pass, so it doesn't affect timing
+
+
+import numpy as np
+import tracemalloc
+from time import perf_counter
+from models import DelayLine
+
+R = 2**12 # RADIX
+N = 2**13 # Amount of test samples
+
+x = np.random.randint( -2**15, 2**15-1, N )
+
+class AppendDelayLine:
+    def __init__( self, N ):
+        self.x = np.zeros( N, dtype=int )
+
+    def __call__( self, xn ):
+        xz     = self.x[-1]
+        self.x = np.append( xn, self.x[:-1] )
+        return xz
+
+def timing( delay_line ):
+    t0 = perf_counter()
+    for i in range(N):
+        delay_line( x[i] )
+    return ( perf_counter() - t0 ) / N
+
+def allocations( delay_line ):
+    big_allocs  = 0
+    total_bytes = 0
+    tracemalloc.start()
+    for i in range(N):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        delay_line( x[i] )
+        extra = tracemalloc.get_traced_memory()[1] - before
+        total_bytes += extra
+        if( extra >= R * x.itemsize ):
+            big_allocs += 1
+    tracemalloc.stop()
+    return big_allocs, total_bytes / N
+
+ref = AppendDelayLine( R )
+dl  = DelayLine( R )
+out_ref = np.array( [ ref(x[i]) for i in range(N) ] )
+out_dl  = np.array( [ dl(x[i])  for i in range(N) ] )
+if( not np.array_equal( out_ref, out_dl ) ):
+    print( "DelayLine output doesn't match np.append version" )
+    exit()
+
+print( "N = %d, %d samples" % ( R, N ) )
+print( "%-12s %14s %20s %22s" % ( "", "time/sample", "N-sized allocations", "peak bytes/sample" ) )
+for name, cls in ( ( "np.append", AppendDelayLine ), ( "DelayLine", DelayLine ) ):
+    t = timing( cls( R ) )
+    a, b = allocations( cls( R ) )
+    print( "%-12s %11.3f us %20d %22.1f" % ( name, t*1e6, a, b ) )
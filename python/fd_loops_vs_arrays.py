@@ -0,0 +1,130 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+# Per-element Python loops versus array versions of the _fd functions from
+# utility_functions.py. All of them are linear in T, so every version is timed
+# on a slice of rows and the time is scaled to T: loops on LOOP_ROWS rows (the
+# whole ( 1e5, 4096 ) spectrogram would take hours), arrays on ARRAY_ROWS rows
+# (it would take ~6.5 GB per complex array). Results are checked to be
+# identical on the common slice.
+#
+#   python3 fd_loops_vs_arrays.py [T] [R]
+
+import numpy as np
+import sys
+from time import perf_counter
+from utility_functions import *
+
+T          = int( float( sys.argv[1] ) ) if( len( sys.argv ) > 1 ) else 10**5
+R          = int( sys.argv[2] ) if( len( sys.argv ) > 2 ) else 4096
+LOOP_ROWS  = 4
+ARRAY_ROWS = min( T, max( LOOP_ROWS, 2**23 // R ) )
+DW         = 16
+
+############################################################################
+# Loop versions, as they were
+
+def nmse_fd_loop( x, ref, N, R ):
+    nmse = lambda a,b : 0. if any( [a==0, b==0] ) else 10 * np.log10( a / b )
+    error_re_acc = 0
+    error_im_acc = 0
+    ref_re_acc   = 0
+    ref_im_acc   = 0
+    for t in range(N):
+        for k in range(R):
+            error_re_acc += ( x[t,k].real - ref[t,k].real )**2
+            error_im_acc += ( x[t,k].imag - ref[t,k].imag )**2
+            ref_re_acc   += ref[t,k].real**2
+            ref_im_acc   += ref[t,k].imag**2
+    return nmse( error_re_acc, ref_re_acc ), nmse( error_im_acc, ref_im_acc )
+
+def peak_error_fd_loop( x, ref, N, R, DW ):
+    peak_error_re = 0
+    peak_error_im = 0
+    for t in range(N):
+        for k in range(R):
+            error_re = abs(x[t,k].real - ref[t,k].real)
+            error_im = abs(x[t,k].imag - ref[t,k].imag)
+            if( error_re > peak_error_re ):
+                peak_error_re = error_re
+            if( error_im > peak_error_im ):
+                peak_error_im = error_im
+    return 100*peak_error_re/2**(DW-1), 100*peak_error_im/2**(DW-1)
+
+def hanning_fd_loop( x, N, R ):
+    y = np.zeros_like( x )
+    for t in range(N):
+        y[t,0] = 0.5 * x[t,0] - 0.25 * x[t,1]
+        for n in range(1,R-1):
+            y[t,n] = 0.5 * x[t,n] - 0.25 * ( x[t,n-1] + x[t,n+1] )
+        y[t,R-1] = 0.5 * x[t,R-1] - 0.25 * x[t,R-2]
+    return y
+
+def smoothing_fd_loop( x, R, N, a=0.1, b=0.9):
+    w = twiddle_generator( R, 'forward' )
+    y = np.zeros_like( x, dtype=complex )
+    for n in range(R):
+        y[0,n] = a * x[0,n]
+        for t in range(N-1):
+            y[t,n] = a * x[t,n] + b * y[t-1,n] * w[n]
+    return y
+
+def complex_to_real_loop( x, N, R  ):
+    y = np.zeros_like( x, dtype=float )
+    for t in range(N):
+        for n in range(R):
+            y[t,n] = x[t,n].real
+    return y
+
+############################################################################
+
+rng = np.random.default_rng( 0 )
+ref = rng.normal( 0.0, 2**12, ( ARRAY_ROWS, R ) ) + 1j*rng.normal( 0.0, 2**12, ( ARRAY_ROWS, R ) )
+x   = np.round( ref + rng.normal( 0.0, 1.0, ref.shape ) + 1j*rng.normal( 0.0, 1.0, ref.shape ) )
+
+tests = [
+  ( "nmse_fd",         nmse_fd_loop,         nmse_fd,         lambda n : ( x[:n], ref[:n], n, R ) ),
+  ( "peak_error_fd",   peak_error_fd_loop,   peak_error_fd,   lambda n : ( x[:n], ref[:n], n, R, DW ) ),
+  ( "hanning_fd",      hanning_fd_loop,      hanning_fd,      lambda n : ( x[:n], n, R ) ),
+  ( "smoothing_fd",    smoothing_fd_loop,    smoothing_fd,    lambda n : ( x[:n], R, n ) ),
+  ( "complex_to_real", complex_to_real_loop, complex_to_real, lambda n : ( x[:n], n, R ) ),
+]
+
+def timing( f, args ):
+    t0  = perf_counter()
+    res = f( *args )
+    return perf_counter() - t0, res
+
+print( "T = %d, R = %d (loops timed on %d rows, arrays on %d rows)" % ( T, R, LOOP_ROWS, ARRAY_ROWS ) )
+print( "%-16s %14s %14s %10s %10s" % ( "", "loops, s", "arrays, s", "speedup", "identical" ) )
+for name, loop_f, array_f, args in tests:
+    t_loop,  res_loop  = timing( loop_f,  args( LOOP_ROWS ) )
+    _,       res_check = timing( array_f, args( LOOP_ROWS ) )
+    t_array, _         = timing( array_f, args( ARRAY_ROWS ) )
+    t_loop  = t_loop  * T / LOOP_ROWS
+    t_array = t_array * T / ARRAY_ROWS
+    same = np.array_equal( np.asarray( res_loop ), np.asarray( res_check ) )
+    print( "%-16s %14.1f %14.3f %9.0fx %10s" % ( name, t_loop, t_array, t_loop/t_array, same ) )
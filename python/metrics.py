@@ -0,0 +1,154 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+# Block by block version of nmse_fd / peak_error_fd. Blocks of ( T, R ) model
+# output and reference come in, only O(R) state is kept, so accuracy runs of
+# any length take constant memory:
+#
+#   acc = ErrorAccumulator( R, DW )
+#   for x, ref in ...:
+#       acc.update( x, ref )
+#   print( acc.nmse(), acc.peak_error() )
+#
+# nmse() and peak_error() are the same numbers nmse_fd() and peak_error_fd()
+# give for the whole spectrogram (the energy sums are accumulated in the same
+# order). Per-bin error statistics (mean, std, peak, NMSE) are kept with
+# Welford/Chan updates, so they are stable for long runs. merge() adds the
+# results of another accumulator, e.g. of a worker that processed another part
+# of the signal. Merged energy sums are added as whole numbers, so they may
+# differ from the single pass ones in the last bits.
+
+import numpy as np
+from utility_functions import seq_sum
+
+class ErrorAccumulator:
+    def __init__( self, R, DW=16 ):
+        self.R            = R
+        self.DW           = DW
+        self.n            = 0
+        # nmse_fd() sums
+        self.error_re_acc = 0
+        self.error_im_acc = 0
+        self.ref_re_acc   = 0
+        self.ref_im_acc   = 0
+        # Per bin
+        self.peak_re      = np.zeros( R )
+        self.peak_im      = np.zeros( R )
+        self.mean_re      = np.zeros( R )
+        self.mean_im      = np.zeros( R )
+        self.m2_re        = np.zeros( R ) # sum of squared deviations from mean
+        self.m2_im        = np.zeros( R )
+        self.error_re_bin = np.zeros( R ) # sum of squared errors
+        self.error_im_bin = np.zeros( R )
+        self.ref_re_bin   = np.zeros( R )
+        self.ref_im_bin   = np.zeros( R )
+
+    def update( self, x, ref ):
+        x, ref = np.asarray( x ), np.asarray( ref )
+        if( x.ndim != 2 or x.shape != ref.shape or x.shape[1] != self.R ):
+            print( "ErrorAccumulator : wrong data shape" )
+            exit()
+        if( len(x) == 0 ):
+            return
+        e_re = x.real - ref.real
+        e_im = x.imag - ref.imag
+        self.error_re_acc = seq_sum( self.error_re_acc, e_re**2 )
+        self.error_im_acc = seq_sum( self.error_im_acc, e_im**2 )
+        self.ref_re_acc   = seq_sum( self.ref_re_acc,   ref.real**2 )
+        self.ref_im_acc   = seq_sum( self.ref_im_acc,   ref.imag**2 )
+        np.fmax( self.peak_re, np.fmax.reduce( np.abs( e_re ), axis=0 ), out=self.peak_re )
+        np.fmax( self.peak_im, np.fmax.reduce( np.abs( e_im ), axis=0 ), out=self.peak_im )
+        self.error_re_bin += ( e_re**2 ).sum( axis=0 )
+        self.error_im_bin += ( e_im**2 ).sum( axis=0 )
+        self.ref_re_bin   += ( ref.real**2 ).sum( axis=0 )
+        self.ref_im_bin   += ( ref.imag**2 ).sum( axis=0 )
+        n    = len(x)
+        m_re = e_re.mean( axis=0 )
+        m_im = e_im.mean( axis=0 )
+        self.combine( n, m_re, m_im, ( ( e_re - m_re )**2 ).sum( axis=0 ),
+                                     ( ( e_im - m_im )**2 ).sum( axis=0 ) )
+
+    # Chan et al. pairwise update of mean and m2 with a group of n samples
+    def combine( self, n, mean_re, mean_im, m2_re, m2_im ):
+        total    = self.n + n
+        d_re     = mean_re - self.mean_re
+        d_im     = mean_im - self.mean_im
+        self.mean_re = self.mean_re + d_re * n / total
+        self.mean_im = self.mean_im + d_im * n / total
+        self.m2_re   = self.m2_re + m2_re + d_re**2 * self.n * n / total
+        self.m2_im   = self.m2_im + m2_im + d_im**2 * self.n * n / total
+        self.n       = total
+
+    def merge( self, other ):
+        if( other.R != self.R ):
+            print( "ErrorAccumulator : can't merge accumulators of different R" )
+            exit()
+        if( other.n == 0 ):
+            return self
+        self.error_re_acc = self.error_re_acc + other.error_re_acc
+        self.error_im_acc = self.error_im_acc + other.error_im_acc
+        self.ref_re_acc   = self.ref_re_acc   + other.ref_re_acc
+        self.ref_im_acc   = self.ref_im_acc   + other.ref_im_acc
+        np.fmax( self.peak_re, other.peak_re, out=self.peak_re )
+        np.fmax( self.peak_im, other.peak_im, out=self.peak_im )
+        self.error_re_bin += other.error_re_bin
+        self.error_im_bin += other.error_im_bin
+        self.ref_re_bin   += other.ref_re_bin
+        self.ref_im_bin   += other.ref_im_bin
+        self.combine( other.n, other.mean_re, other.mean_im, other.m2_re, other.m2_im )
+        return self
+
+    # Same as nmse_fd(), dB
+    def nmse( self ):
+        nmse = lambda a,b : 0. if any( [a==0, b==0] ) else 10 * np.log10( a / b )
+        return nmse( self.error_re_acc, self.ref_re_acc ), \
+               nmse( self.error_im_acc, self.ref_im_acc )
+
+    # Same as peak_error_fd(), % of full scale
+    def peak_error( self ):
+        return 100*self.peak_re.max( initial=0 )/2**(self.DW-1), \
+               100*self.peak_im.max( initial=0 )/2**(self.DW-1)
+
+    # Per bin NMSE, dB. Bins without error or reference energy are 0 dB as in
+    # nmse_fd()
+    def bin_nmse( self ):
+        def nmse( a, b ):
+            y  = np.zeros( self.R )
+            ok = ( a != 0 ) & ( b != 0 )
+            y[ok] = 10 * np.log10( a[ok] / b[ok] )
+            return y
+        return nmse( self.error_re_bin, self.ref_re_bin ), \
+               nmse( self.error_im_bin, self.ref_im_bin )
+
+    def bin_mean( self ):
+        return self.mean_re.copy(), self.mean_im.copy()
+
+    def bin_std( self ):
+        n = max( self.n, 1 )
+        return np.sqrt( self.m2_re / n ), np.sqrt( self.m2_im / n )
+
+    def bin_peak_error( self ):
+        return self.peak_re.copy(), self.peak_im.copy()
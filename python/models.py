@@ -33,6 +33,74 @@ from copy import copy
 from utility_functions import twiddle_generator
 from utility_functions import twiddle_generator_int
 from utility_functions import sat
+from utility_functions import sat_array
+from utility_functions import rotator_int
+from utility_functions import cmul
+from utility_functions import window_fd
+from utility_functions import window_fd_at
+from utility_functions import window_support
+
+############################################################################
+# Helpers
+
+# Circular delay line of N elements (f[t-N] source for the comb filter). The
+# write pointer moves instead of the data, so a new sample costs O(1) work and
+# no allocation, like the xz_mem RAM in ../rtl/sdft.sv. Elements could be
+# scalars or arrays of given shape (Sidft keeps whole spectra here). dtype is
+# promoted the same way np.append would promote it, so integer delay line
+# starts to hold floats once float samples come in
+class DelayLine:
+    def __init__( self, N, shape=(), dtype=int ):
+        self.N         = N
+        self.buf       = np.zeros( (N,) + tuple(shape), dtype=dtype )
+        self.idx       = 0
+        self.last_type = self.buf.dtype
+
+    # np.result_type() is relatively slow, so it is called only when the type
+    # of incoming data changes
+    def promote( self, x ):
+        x_type = x.dtype if( hasattr( x, 'dtype' ) ) else type( x )
+        if( x_type == self.last_type ):
+            return
+        self.last_type = x_type
+        dtype = np.result_type( self.buf, x )
+        if( dtype != self.buf.dtype ):
+            self.buf = self.buf.astype( dtype )
+
+    # Push xn, return the element pushed N calls ago
+    def __call__( self, xn ):
+        self.promote( xn )
+        xz = self.buf[self.idx]
+        if( self.buf.ndim > 1 ):
+            xz = xz.copy()
+        self.buf[self.idx] = xn
+        self.idx = self.idx + 1 if( self.idx < self.N-1 ) else 0
+        return xz
+
+    # Push the whole block, return the delayed block of the same length
+    def block( self, x ):
+        self.promote( x )
+        hist = np.concatenate( ( self.buf[self.idx:], self.buf[:self.idx], x ) )
+        self.buf[:] = hist[len(hist)-self.N:]
+        self.idx    = 0
+        return hist[:len(x)]
+
+    # Last N pushed elements, the oldest first
+    def history( self ):
+        return np.concatenate( ( self.buf[self.idx:], self.buf[:self.idx] ) )
+
+# Bins a model has to compute to give the bins (slice or index list) of its R
+# bins spectrum and pos for window_fd_at(). Without the window it's just the
+# selection. With the window on, the neighbours are computed too, so selected
+# columns are exactly the ones of the full windowed spectrum. pos is None when
+# the whole spectrum is computed anyway
+def select_bins( R, bins, hanning_en, window ):
+    idx = np.arange( R )[bins]
+    if( not hanning_en ):
+        return idx, None
+    if( np.array_equal( idx, np.arange( R ) ) ):
+        return idx, None
+    return window_support( idx, R, window )
 
 ############################################################################
 # Models
@@ -42,56 +110,154 @@ from utility_functions import sat
 class Sdft:
     def __init__( self, N ):
         self.N      = N
-        self.x      = np.zeros( N, dtype=float   )
+        self.x      = DelayLine( N, dtype=float )
         self.y_prev = np.zeros( N, dtype=complex )
         self.w      = twiddle_generator( N, 'inverse' )
 
     def __call__( self, xn ):
-        xz = self.x[-1]
-        self.x = np.append( xn, self.x[:-1] )
+        xz = self.x( xn )
         comb = complex( xn-xz, 0. )
-        print( self.N )
-        y = np.zeros( self.N, dtype=complex )
-        print( y.shape )
-        for n in range( self.N ):
-            y[n] = ( comb + self.y_prev[n] ) * self.w[n]
-        self.y_prev = y
+        y = cmul( comb + self.y_prev, self.w )
+        self.y_prev = copy(y)
+        return y
+
+    def process( self, block ):
+        x          = np.asarray( block )
+        xz         = self.x.block( x )
+        comb       = x - xz
+        y          = np.zeros( ( len(x), self.N ), dtype=complex )
+        y_prev     = self.y_prev
+        for t in range( len(x) ):
+            np.add( y_prev, comb[t], out=y[t] )
+            cmul( y[t], self.w, out=y[t] )
+            y_prev = y[t]
+        self.y_prev = copy(y_prev)
         return y
 
 
 # Real input complex output
 # Limited precision model. Maybe it sould be merged with Sdft. Now it doesn't
 # seem desirable. Names are kept close to same signals in Verilog (../rtl/sdft.sv)
+#
+# bins (slice or index list) makes the model compute only these bins, so a few
+# bins of a large N cost O(K) per sample instead of O(N). They are independent
+# recursions, so the result is the same columns of the full model. Window mixes
+# neighbour bins, so with hanning_en the neighbours are computed as well (see
+# select_bins), and the result is still the same columns. SdftIntRL and
+# SdftIntReal take bins the same way
+#
+# idw turns on saturation as ../rtl/sdft_default.sv does it (comb_sat, real
+# part of y_prev + comb is saturated to IDW bits). sat_count is the number of
+# saturation events (sat_alarm_o) of the last call / processed block, sat_total
+# is the number since the model was created. Without idw nothing is saturated
+# and counted, as before. SdftIntRL and SdftIntReal take idw the same way
+#
+# hanning_en turns on the frequency domain window, window is the kernel name
+# from WINDOWS in utility_functions.py ('hann', 'hamming', 'blackman')
 class SdftInt:
-    def __init__( self, N, bitwidth=32, hanning_en=False ):
+    def __init__( self, N, bitwidth=32, hanning_en=False, bins=slice(None), idw=None, window='hann' ):
         self.bitwidth    = bitwidth
         self.scale       = 2**(bitwidth-1)
         self.N           = N
         self.hanning_en  = hanning_en
-        self.x           = np.zeros( N, dtype=int   )
-        self.y_prev      = np.zeros( N, dtype=complex )
-        self.w           = twiddle_generator_int( N, 'inverse', bitwidth )
-
-    def hann_in_freq( self, x ):
-        y = np.zeros_like( x )
-        y[0] = 0.5 * x[0] - 0.25 * x[1]
-        for n in range( 1, self.N-1 ):
-            y[n] = 0.5 * x[n] - 0.25 * ( x[n-1] + x[n+1])
-        y[self.N-1] = 0.5 * x[self.N-1] - 0.25 * x[self.N-2]
-        return y
+        self.window      = window
+        self.idw         = idw
+        self.sat_count   = 0
+        self.sat_total   = 0
+        self.x           = DelayLine( N )
+        self.bins, self.pos = select_bins( N, bins, hanning_en, window )
+        self.w           = twiddle_generator_int( N, 'inverse', bitwidth )[self.bins]
+        self.y_prev      = np.zeros( len(self.w), dtype=complex )
+
+    # Saturates real part of y_comb in place, returns number of events
+    def comb_sat( self, y_comb ):
+        if( self.idw is None ):
+            return 0
+        return sat_array( y_comb.real, self.idw, out=y_comb.real )[1]
+
+    def count_sat( self, n ):
+        self.sat_count  = n
+        self.sat_total += n
 
+    # All bins are independent, so the resonator loop is computed for all of
+    # them at once. np.round() rounds real and imaginary parts separately, half
+    # to even
     def __call__( self, xn ):
-        xz     = self.x[-1]
-        self.x = np.append( xn, self.x[:-1] )
+        xz     = self.x( xn )
         comb   = complex( xn-xz, 0. ) # bitwidth + 1
-        y = np.zeros( self.N, dtype=complex )
-        for n in range( self.N ):
-            y_comb  = comb + self.y_prev[n] # bitwidth + 2
-            y[n] = round( y_comb * self.w[n] / self.scale ) # bitwidth + 2
-            #y[n] = sat( y[n], self.bitwidth )
+        y_comb = comb + self.y_prev # bitwidth + 2
+        self.count_sat( self.comb_sat( y_comb ) )
+        y      = np.round( cmul( y_comb, self.w ) / self.scale ) # bitwidth + 2
         self.y_prev = copy(y)
         if( self.hanning_en ):
-            y = self.hann_in_freq( y )
+            y = window_fd_at( y, self.pos, self.window )
+        return y
+
+    # Same as calling the model for every sample of the block, but without
+    # per-sample calls and list-to-array conversion. Returns (T, N) spectrogram
+    # and keeps the state, so a long signal could be fed in chunks
+    def process( self, block ):
+        x          = np.asarray( block )
+        xz         = self.x.block( x )
+        comb       = x - xz # bitwidth + 1
+        y          = np.zeros( ( len(x), len(self.w) ), dtype=complex )
+        y_prev     = self.y_prev
+        n_sat      = 0
+        for t in range( len(x) ):
+            np.add( y_prev, comb[t], out=y[t] ) # bitwidth + 2
+            n_sat += self.comb_sat( y[t] )
+            cmul( y[t], self.w, out=y[t] )
+            np.divide( y[t], self.scale, out=y[t] )
+            np.round( y[t], out=y[t] )
+            y_prev = y[t]
+        self.y_prev = copy(y_prev)
+        self.count_sat( n_sat )
+        if( self.hanning_en ):
+            y = window_fd_at( y, self.pos, self.window )
+        return y
+
+
+# C channels of SdftInt with the same N and bitwidth. State is ( C, N ), twiddles
+# are shared, so one vectorized update per sample serves all channels. Every
+# channel is bit exact with a separate SdftInt fed by the same samples
+class SdftIntBank( SdftInt ):
+    def __init__( self, N, C, bitwidth=32, hanning_en=False, idw=None, window='hann' ):
+        super().__init__( N, bitwidth, hanning_en, idw=idw, window=window )
+        self.C           = C
+        self.x           = DelayLine( N, ( C, ) )
+        self.y_prev      = np.zeros( ( C, N ), dtype=complex )
+
+    # xn is C samples, one per channel. Returns ( C, N )
+    def __call__( self, xn ):
+        xn     = np.asarray( xn )
+        xz     = self.x( xn )
+        comb   = ( xn - xz )[:,None] # bitwidth + 1
+        y_comb = comb + self.y_prev # bitwidth + 2
+        self.count_sat( self.comb_sat( y_comb ) )
+        y      = np.round( cmul( y_comb, self.w ) / self.scale ) # bitwidth + 2
+        self.y_prev = copy(y)
+        if( self.hanning_en ):
+            y = window_fd_at( y, self.pos, self.window )
+        return y
+
+    # ( T, C ) block in, ( T, C, N ) spectrogram out
+    def process( self, block ):
+        x          = np.asarray( block )
+        comb       = ( x - self.x.block( x ) )[...,None] # bitwidth + 1
+        y          = np.zeros( ( len(x), self.C, self.N ), dtype=complex )
+        y_prev     = self.y_prev
+        n_sat      = 0
+        for t in range( len(x) ):
+            np.add( y_prev, comb[t], out=y[t] ) # bitwidth + 2
+            n_sat += self.comb_sat( y[t] )
+            cmul( y[t], self.w, out=y[t] )
+            np.divide( y[t], self.scale, out=y[t] )
+            np.round( y[t], out=y[t] )
+            y_prev = y[t]
+        self.y_prev = copy(y_prev)
+        self.count_sat( n_sat )
+        if( self.hanning_en ):
+            y = window_fd_at( y, self.pos, self.window )
         return y
 
 
@@ -99,47 +265,95 @@ class SdftInt:
 # Limited precision model. Maybe it sould be merged with Sdft. Now it doesn't
 # seem desirable. Names are kept close to same signals in Verilog (../rtl/sdft.sv)
 # Rick Lyons architecture
+#
+# idw saturates y (y_sat) and fd_real (fd_real_sat) as ../rtl/sdft_rl.sv does.
+# An event is a bin where any of them saturated (sat_alarm_1 | sat_alarm_2)
 class SdftIntRL:
-    def __init__( self, N, bitwidth=32, hanning_en=False ):
+    def __init__( self, N, bitwidth=32, hanning_en=False, bins=slice(None), idw=None, window='hann' ):
         self.bitwidth    = bitwidth
         self.scale       = 2**(bitwidth-1)
         self.N           = N
         self.hanning_en  = hanning_en
-        self.x           = np.zeros( N, dtype=int )
-        self.y_z1        = np.zeros( N, dtype=int )
-        self.y_z2        = np.zeros( N, dtype=int )
-        self.w           = twiddle_generator_int( N, 'inverse', bitwidth )
-
-    def hann_in_freq( self, x ):
-        y = np.zeros_like( x )
-        y[0] = 0.5 * x[0] - 0.25 * x[1]
-        for n in range( 1, self.N-1 ):
-            y[n] = 0.5 * x[n] - 0.25 * ( x[n-1] + x[n+1])
-        y[self.N-1] = 0.5 * x[self.N-1] - 0.25 * x[self.N-2]
-        return y
+        self.window      = window
+        self.idw         = idw
+        self.sat_count   = 0
+        self.sat_total   = 0
+        self.x           = DelayLine( N )
+        self.bins, self.pos = select_bins( N, bins, hanning_en, window )
+        self.w           = twiddle_generator_int( N, 'inverse', bitwidth )[self.bins]
+        self.y_z1        = np.zeros( len(self.w), dtype=int )
+        self.y_z2        = np.zeros( len(self.w), dtype=int )
+        # Division by scale (power of 2) is exact, so y * ( 2*cos / scale )
+        # is exactly the same double as y * 2 * cos / scale
+        self.cos2        = 2 * self.w.real / self.scale
+        self.cos         = self.w.real / self.scale
+        self.sin         = self.w.imag / self.scale
+        # Scratch buffers, all the work is done in place
+        self.f_buf       = np.zeros( len(self.w), dtype=float )
+        self.i_buf       = np.zeros( len(self.w), dtype=int )
+
+    # One sample for all bins, result goes to y_out. The new resonator output
+    # is written over y_z2 and then the buffers just swap their roles. Integer
+    # comb keeps the resonator sum in integers, float comb (float stimulus)
+    # makes it float, truncated when stored, as int array assignment does.
+    # Returns the number of saturation events
+    def step( self, comb, y_out ):
+        f, i = self.f_buf, self.i_buf
+        # Real resonator loop
+        np.multiply( self.y_z1, self.cos2, out=f )
+        np.round( f, out=f ) # y_z1_2cos
+        if( isinstance( comb, ( int, np.integer ) ) ):
+            np.copyto( i, f, casting='unsafe' )
+            np.add( i, comb, out=i )
+            np.subtract( i, self.y_z2, out=self.y_z2 )
+        else:
+            np.add( f, comb, out=f )
+            np.subtract( f, self.y_z2, out=f )
+            np.copyto( self.y_z2, f, casting='unsafe' )
+        y = self.y_z2
+        if( self.idw is not None ):
+            y_sat_mask = sat_array( y, self.idw, out=y )[2]
+        # Feedforward stage
+        np.multiply( y, self.cos, out=f )
+        np.round( f, out=f )
+        np.copyto( i, f, casting='unsafe' )
+        np.subtract( i, self.y_z1, out=i )
+        n_sat = 0
+        if( self.idw is not None ):
+            fd_real_sat_mask = sat_array( i, self.idw, out=i )[2]
+            n_sat = int( np.count_nonzero( y_sat_mask | fd_real_sat_mask ) )
+        y_out.real = i
+        np.multiply( y, self.sin, out=f )
+        np.round( f, out=f )
+        np.copyto( i, f, casting='unsafe' )
+        y_out.imag = i
+        self.y_z1, self.y_z2 = y, self.y_z1
+        return n_sat
+
+    def count_sat( self, n ):
+        self.sat_count  = n
+        self.sat_total += n
 
     def __call__( self, xn ):
-        xz     = self.x[-1]
-        self.x = np.append( xn, self.x[:-1] )
-        comb   = xn-xz
-        y = np.zeros( self.N, dtype=int )
-        y_fd_real = np.zeros( self.N, dtype=int )
-        y_fd_imag = np.zeros( self.N, dtype=int )
-        # Resonator loop
-        for n in range( self.N ):
-            # Real resonator loop
-            y_z1_2cos = round( self.y_z1[n] * 2 * self.w[n].real / self.scale )
-            y[n]     = comb + y_z1_2cos - self.y_z2[n]
-            # Feedforward stage
-            y_fd_real[n] = round( y[n] * self.w[n].real / self.scale ) - self.y_z1[n]
-            y_fd_imag[n] = round( y[n] * self.w[n].imag / self.scale )
-        self.y_z2 = copy( self.y_z1 )
-        self.y_z1 = copy(y)
-        y_out = np.array([ complex(y_fd_real[n], y_fd_imag[n]) for n in range(self.N) ])
+        xz    = self.x( xn )
+        y_out = np.zeros( len(self.w), dtype=complex )
+        self.count_sat( self.step( xn-xz, y_out ) )
         if( self.hanning_en ):
-            y_out = self.hann_in_freq( y_out )
+            y_out = window_fd_at( y_out, self.pos, self.window )
         return y_out
 
+    def process( self, block ):
+        x    = np.asarray( block )
+        comb = x - self.x.block( x )
+        y    = np.zeros( ( len(x), len(self.w) ), dtype=complex )
+        n_sat = 0
+        for t in range( len(x) ):
+            n_sat += self.step( comb[t], y[t] )
+        self.count_sat( n_sat )
+        if( self.hanning_en ):
+            y = window_fd_at( y, self.pos, self.window )
+        return y
+
 
 # This model is for the case when we need only the real part of the product.
 # We remember that DFT's real n=[N/2-N) values are [0-N/2) values mirrored over
@@ -149,95 +363,208 @@ class SdftIntRL:
 # computation loop, because it costs a lot of memeory. Idk how to do it now,
 # relation with DCT is under research
 class SdftIntReal:
-    def __init__( self, N, bitwidth=32, hanning_en=False ):
+    def __init__( self, N, bitwidth=32, hanning_en=False, bins=slice(None), idw=None, window='hann' ):
         self.bitwidth    = bitwidth
         self.scale       = 2**(bitwidth-1)
         self.N           = N
         self.hanning_en  = hanning_en
-        self.x           = np.zeros( N, dtype=int   )
-        self.y_prev      = np.zeros( N//2, dtype=complex )
-        self.w           = twiddle_generator_int( N, 'inverse', bitwidth )[:N//2]
-
-    def hann_in_freq( self, x ):
-        local_N = self.N//2
-        y = np.zeros_like( x )
-        y[0] = 0.5 * x[0] - 0.25 * x[1]
-        for n in range( 1, local_N-1 ):
-            y[n] = 0.5 * x[n] - 0.25 * ( x[n-1] + x[n+1])
-        y[local_N-1] = 0.5 * x[local_N-1] - 0.25 * x[local_N-2]
-        return y
+        self.window      = window
+        self.idw         = idw
+        self.sat_count   = 0
+        self.sat_total   = 0
+        self.x           = DelayLine( N )
+        self.bins, self.pos = select_bins( N//2, bins, hanning_en, window )
+        self.w           = twiddle_generator_int( N, 'inverse', bitwidth )[self.bins]
+        self.y_prev      = np.zeros( len(self.w), dtype=complex )
+
+    # Saturates real part of y_comb in place, returns number of events
+    def comb_sat( self, y_comb ):
+        if( self.idw is None ):
+            return 0
+        return sat_array( y_comb.real, self.idw, out=y_comb.real )[1]
+
+    def count_sat( self, n ):
+        self.sat_count  = n
+        self.sat_total += n
 
     def __call__( self, xn ):
-        xz     = self.x[-1]
-        self.x = np.append( xn, self.x[:-1] )
+        xz     = self.x( xn )
         comb   = complex( xn-xz, 0. )
-        y = np.zeros( (self.N//2), dtype=complex )
-        for n in range( (self.N//2) ):
-            y_comb  = comb + self.y_prev[n] # bitwidth + 2
-            y[n]    = round( y_comb * self.w[n] / self.scale ) # bitwidth + 2
-            #y[n] = sat( y[n], self.bitwidth )
+        y_comb = comb + self.y_prev # bitwidth + 2
+        self.count_sat( self.comb_sat( y_comb ) )
+        y      = np.round( cmul( y_comb, self.w ) / self.scale ) # bitwidth + 2
         self.y_prev = copy(y)
         if( self.hanning_en ):
-            y = self.hann_in_freq( y )
+            y = window_fd_at( y, self.pos, self.window )
         return y.real
 
+    # The recursion is complex, but only real part is stored. Window weights are
+    # real, so window of the real part is exactly the real part of complex one
+    def process( self, block ):
+        x      = np.asarray( block )
+        comb   = x - self.x.block( x ) # bitwidth + 1
+        y      = np.zeros( ( len(x), len(self.w) ), dtype=float )
+        y_prev = self.y_prev
+        y_next = np.zeros_like( y_prev )
+        n_sat  = 0
+        for t in range( len(x) ):
+            np.add( y_prev, comb[t], out=y_next ) # bitwidth + 2
+            n_sat += self.comb_sat( y_next )
+            cmul( y_next, self.w, out=y_next )
+            np.divide( y_next, self.scale, out=y_next )
+            np.round( y_next, out=y_next )
+            y[t] = y_next.real
+            y_prev, y_next = y_next, y_prev
+        self.y_prev = copy(y_prev)
+        self.count_sat( n_sat )
+        if( self.hanning_en ):
+            y = window_fd_at( y, self.pos, self.window )
+        return y
+
+# Exact fixed point version of SdftInt / SdftIntReal. Real and imaginary parts
+# of the state are kept in separate int64 arrays and the rotation is done by
+# rotator_int() in integers, so nothing goes through double precision and the
+# result doesn't depend on whether products fit 53 bit mantissa (they don't
+# with IDW=32 and wide twiddles). Input samples are truncated to integers the
+# same way test scripts write them for RTL ("%d").
+#
+# rounding='half_even' reproduces SdftInt exactly (while SdftInt is exact),
+# rounding='half_up' is what ../rtl/rotator.sv does. spectrum='half' computes
+# N/2 bins as SdftIntReal does. Output is a ( re, im ) pair of int64 arrays.
+# Frequency domain window is done with shifts as ../rtl/hanning_fd.sv does it
+# for Hann (window_fd with fixed=True), because there is no exact 0.25 in integers
+class SdftIntExact:
+    def __init__( self, N, bitwidth=32, hanning_en=False, spectrum='full', rounding='half_even', window='hann' ):
+        self.bitwidth    = bitwidth
+        self.N           = N
+        self.hanning_en  = hanning_en
+        self.window      = window
+        self.rounding    = rounding
+        self.bins        = N if( spectrum=='full' ) else N//2
+        self.x           = DelayLine( N )
+        self.y_re        = np.zeros( self.bins, dtype=np.int64 )
+        self.y_im        = np.zeros( self.bins, dtype=np.int64 )
+        w                = twiddle_generator_int( N, 'inverse', bitwidth )[:self.bins]
+        self.w_re        = w.real.astype( np.int64 )
+        self.w_im        = w.imag.astype( np.int64 )
+
+    def step( self, comb ):
+        self.y_re, self.y_im = rotator_int( self.y_re + comb, self.y_im,
+                                            self.w_re, self.w_im,
+                                            self.bitwidth, self.rounding )
+
+    def __call__( self, xn ):
+        xn = int( xn )
+        self.step( xn - int( self.x( xn ) ) )
+        if( self.hanning_en ):
+            return window_fd( self.y_re, self.window, fixed=True ), window_fd( self.y_im, self.window, fixed=True )
+        return self.y_re.copy(), self.y_im.copy()
+
+    def process( self, block ):
+        x    = np.asarray( block ).astype( np.int64 )
+        comb = x - self.x.block( x )
+        y_re = np.zeros( ( len(x), self.bins ), dtype=np.int64 )
+        y_im = np.zeros( ( len(x), self.bins ), dtype=np.int64 )
+        for t in range( len(x) ):
+            self.step( comb[t] )
+            y_re[t] = self.y_re
+            y_im[t] = self.y_im
+        if( self.hanning_en ):
+            return window_fd( y_re, self.window, fixed=True ), window_fd( y_im, self.window, fixed=True )
+        return y_re, y_im
+
 # It is not reasonable to use anything but 'midpoint' mode, but I left the
 # option to choose different block to reconstruct window with in sake of
 # an experiment.
+# Inverse transform from the single frequency domain block (see ../README.md).
+# Frame F[t] gives sample x[t-N+1+m] as sum( F[t,k] * W[k]**m ) / N, midpoint
+# is m = N/2, where W[k]**m are just +1 and -1. 'other' mode takes m from
+# window_idx. Imaginary part is discarded, it's zero for real input anyway.
+#
+# Every output sample depends only on its own frame, so there is no state and
+# process() could be fed by spectrogram chunks of any size one after another,
+# e.g. right from SdftInt.process() of a long signal
 class Ssidft:
     def __init__( self, N, mode='midpoint', window_idx=None ):
         self.N = N
         if( mode not in {'midpoint', 'other'} ):
             print( "Error, mode could be either 'midpoint' or 'other'" )
             exit()
-        if( mode != 'midpoint'):
-            if( window_idx is None ):
-                print( "Error, if 'other' mode is choosen, window_idx must be specified" )
-                exit()
-            if( window_idx==0 ):
-                print( "Error, window_idx can't be 0, it just won't work in this case" )
-                exit()
-            self.w = twiddle_generator( N, 'inverse' )
+        if( mode == 'midpoint' ):
+            window_idx = N // 2
+        if( window_idx is None ):
+            print( "Error, if 'other' mode is choosen, window_idx must be specified" )
+            exit()
+        if( window_idx==0 ):
+            print( "Error, window_idx can't be 0, it just won't work in this case" )
+            exit()
+        self.mode       = mode
+        self.window_idx = window_idx
+        k = np.arange( N )
+        self.w = twiddle_generator( N, 'inverse' )[ ( k * window_idx ) % N ]
 
     def __call__( self, Fn ):
-        f = np.zeros(self.N)
-        if( mode=='midpoint' ):
-            for k in range(self.N):
-                f += -Fn if k%2 else Fn
-        else:
-            for k in range(self.N):
-                f += Fn[k] * self.w[k]
-        return f/N
+        return self.process( np.asarray( Fn )[np.newaxis] )[0]
+
+    # ( T, N ) spectrogram to T samples
+    def process( self, block ):
+        F = np.asarray( block )
+        return ( F @ self.w ).real / self.N
 
 
+# Midpoint only. Bins go through the sign flip and are summed one by one in
+# bin order (np.add.accumulate, not pairwise np.sum), so it's the same double
+# as the plain loop over k gives, then truncated to int as hardware does.
+# Stateless as Ssidft, process() takes spectrogram chunks of any size
 class SsidftInt:
     def __init__( self, N ):
-        self.N = N
+        self.N    = N
+        self.sign = np.where( np.arange( N ) % 2, -1., 1. )
 
     def __call__( self, Fn ):
-        f = 0.0
-        for k in range(self.N):
-            f += -Fn[k].real if k%2 else Fn[k].real
-        return int(np.fix(f/self.N))
+        return int( self.process( np.asarray( Fn )[np.newaxis] )[0] )
+
+    # ( T, N ) spectrogram to T samples
+    def process( self, block ):
+        F = np.real( block ) * self.sign
+        f = np.add.accumulate( F, axis=-1 )[...,-1]
+        return np.fix( f / self.N ).astype( np.int64 )
 
 # Complete Sidft calculating precise inverse transform. Could be used to compare
 # pefrormance or computation speed. No low-precision integer version for this
 # one because I am not going to impement it in hardware anyway.
+#
+# Sample x[t-N+1] is the oldest one in frame F[t] and it's present in all N
+# stored frames F[t-j], at position j. Every frame restores it exactly, Sidft
+# takes the mean of all of them. Sum of the frames rotated by W[k]**j is
+# updated recursively, just like the forward transform:
+#
+# y[t,k] = ( F[t,k] - F[t-N,k] ) / N + y[t-1,k] * W[k],  x[t-N+1] = sum( y[t] ) / N
+#
+# History of frames is a circular ( N, N ) DelayLine. Imaginary part is
+# discarded as in Ssidft
 class Sidft:
     def __init__( self, N ):
         self.N = N
-        self.F = np.zeros((N,N), dtype=complex )
+        self.F = DelayLine( N, (N,), dtype=complex )
         # y here is the sum of contributions from the same bin over all stroed windows
-        self.y_prev = complex( 0., 0. )
+        self.y_prev = np.zeros( N, dtype=complex )
         self.w = twiddle_generator( N, 'inverse' )
 
     def __call__( self, Fn ):
-        Fz = self.F[-1]
-        self.F = np.append( Fn, self.N[:-2] )
-        y = np.zeros( self.N, dtype=complex )
-        for k in range(self.N):
-            y[k] = (Fn[k] - Fz[k])/self.N + self.y_prev[k] * self.w[k]
-        return sum(y) / self.N
-
-
+        return self.process( np.asarray( Fn )[np.newaxis] )[0]
 
+    # ( T, N ) spectrogram to T samples. Frames go through the history one by
+    # one, so it's written in place and nothing N x N sized is allocated
+    def process( self, block ):
+        F      = np.asarray( block )
+        f      = np.zeros( len(F) )
+        y_prev = self.y_prev
+        comb   = np.zeros( self.N, dtype=complex )
+        for t in range( len(F) ):
+            np.subtract( F[t], self.F( F[t] ), out=comb )
+            np.divide( comb, self.N, out=comb )
+            cmul( y_prev, self.w, out=y_prev )
+            np.add( y_prev, comb, out=y_prev )
+            f[t] = y_prev.sum().real
+        return f / self.N
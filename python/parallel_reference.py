@@ -0,0 +1,127 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+# Multiprocess reference generator. SDFT bins are independent recursions, so
+# the bin range is split into contiguous parts and every worker runs the model
+# (SdftInt, SdftIntRL or SdftIntReal) on its own part with bins=slice(...).
+# Input signal and output spectrogram are .npy files mapped into memory: all
+# workers read the same input pages and write their columns straight into the
+# shared ( T, bins ) output, nothing is pickled but file names. Window mixes
+# neighbour bins, so it is applied once the whole spectrum is assembled. The
+# result is bit identical to model( N, ... ).process( x ).
+#
+# Usage:
+#
+#   y = parallel_reference( SdftInt, 4096, x, workers=8, bitwidth=16 )
+#
+# With fname the output stays in this file (np.memmap is returned), so vectors
+# larger than RAM could be generated. Running the script benchmarks it against
+# the single process model: python3 parallel_reference.py [N] [T] [workers]
+#
+
+import numpy as np
+import os
+import sys
+import time
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from models import SdftInt
+from utility_functions import window_fd
+
+# Samples per model.process() call inside a worker, bounds worker memory
+CHUNK = 4096
+
+def reference_worker( job ):
+    model, N, kwargs, bins, x_fname, y_fname = job
+    x    = np.load( x_fname, mmap_mode='r' )
+    y    = np.load( y_fname, mmap_mode='r+' )
+    sdft = model( N, hanning_en=False, bins=bins, **kwargs )
+    for t in range( 0, len(x), CHUNK ):
+        y[t:t+CHUNK,bins] = sdft.process( x[t:t+CHUNK] )
+    y.flush()
+
+def parallel_reference( model, N, x, workers=None, fname=None, **kwargs ):
+    x          = np.asarray( x )
+    hanning_en = kwargs.pop( 'hanning_en', False )
+    workers    = os.cpu_count() if( workers is None ) else workers
+    if( workers == 1 and fname is None ):
+        return model( N, hanning_en=hanning_en, **kwargs ).process( x )
+
+    # Output width and type are the ones the model gives on empty input
+    probe = model( N, hanning_en=hanning_en, **kwargs )
+    empty = probe.process( x[:0] )
+    shape = ( len(x), ) + empty.shape[1:]
+    dtype = empty.dtype
+
+    tmp_dir = tempfile.mkdtemp( prefix="sdft_ref_" )
+    x_fname = os.path.join( tmp_dir, "x.npy" )
+    y_fname = os.path.join( tmp_dir, "y.npy" ) if( fname is None ) else fname
+    np.save( x_fname, x )
+    y = np.lib.format.open_memmap( y_fname, mode='w+', dtype=dtype, shape=shape )
+    del y
+
+    parts = np.array_split( np.arange( shape[1] ), workers )
+    jobs  = [ ( model, N, kwargs, slice( p[0], p[-1]+1 ), x_fname, y_fname )
+              for p in parts if len(p) > 0 ]
+    # fork doesn't run the caller script (test.py) again in every worker
+    if( "fork" in multiprocessing.get_all_start_methods() ):
+        ctx = multiprocessing.get_context( "fork" )
+    else:
+        ctx = multiprocessing.get_context()
+    try:
+        with ProcessPoolExecutor( len(jobs), mp_context=ctx ) as pool:
+            list( pool.map( reference_worker, jobs ) )
+        y = np.load( y_fname, mmap_mode='r+' )
+        if( hanning_en ):
+            for t in range( 0, len(y), CHUNK ):
+                y[t:t+CHUNK] = window_fd( y[t:t+CHUNK], probe.window )
+        if( fname is None ):
+            y = np.array( y )
+    finally:
+        shutil.rmtree( tmp_dir, ignore_errors=True )
+    return y
+
+
+if __name__ == "__main__":
+    N       = int( sys.argv[1] ) if( len( sys.argv ) > 1 ) else 4096
+    T       = int( sys.argv[2] ) if( len( sys.argv ) > 2 ) else 8192
+    workers = int( sys.argv[3] ) if( len( sys.argv ) > 3 ) else os.cpu_count()
+
+    rng = np.random.default_rng( 0 )
+    x   = np.clip( rng.normal( 0.0, 2**12, T ), -2**15, 2**15-1 )
+
+    t0  = time.perf_counter()
+    ref = SdftInt( N, bitwidth=16 ).process( x )
+    t1  = time.perf_counter()
+    y   = parallel_reference( SdftInt, N, x, workers, bitwidth=16 )
+    t2  = time.perf_counter()
+
+    print( f"N={N} T={T} workers={workers}" )
+    print( f"single process : {t1-t0:.2f} s" )
+    print( f"parallel       : {t2-t1:.2f} s ({(t1-t0)/(t2-t1):.2f}x)" )
+    print( f"bit identical  : {np.array_equal( ref, y )}" )
@@ -0,0 +1,191 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+#
+# Cycle level emulator of ../rtl/sdft_default.sv. It goes through the same
+# xz_mem RAM, FIX multipliers, comb_sat, rotator (half up rounding, MSB
+# discard), product_mem RAM and hanning_fd as the RTL does, so the data is the
+# bit exact DUT output. All M bins of a block are computed at once, one block
+# per sample tick, so it's seconds instead of minutes of vsim.
+#
+# Timing follows the RTL control: with ticks every period clocks the block
+# of sample n is M = N (N/2 for "half" SPECTRUM) clocks long:
+#
+#   tick n             : cycle c[n] = n * period
+#   bin k of block n   : cycle c[n] + 1 + k + HANNING_EN + REGISTER_EN
+#   data of block n    : spectrum of sample n-1 (product_mem content before
+#                        it is overwritten), zeros for the first one
+#
+# Ticks closer than M clocks overrun the block, so period >= M. With period
+# == M blocks go back to back and hanning_fd takes the neighbours of the
+# first and last bins from the adjacent blocks; otherwise they are zeros.
+# The RTL counter only wraps at 2**AW, so N must be a power of 2 here.
+#
+# Usage:
+#
+#   emu = SdftDefaultEmu( 256, DW=16, CW=16, IDW=32, period=tb_period( 257 ) )
+#   out = emu.run( x )      # out['re'], out['im'], out['cycle'], ...
+#   emu.timing( 100e6 )     # latency and sample rate for 100 MHz clock
+
+
+import numpy as np
+import sys
+from models import DelayLine
+from utility_functions import twiddle_generator_int
+from utility_functions import rotator_int
+from utility_functions import sat_array
+from utility_functions import window_fd
+
+# tb.sv driver holds sample_tick_i for one clock and then waits CLK_PER_SAMPLE
+# more, so ticks are CLK_PER_SAMPLE+1 clocks apart (every clock for 1)
+def tb_period( clk_per_sample ):
+    return clk_per_sample + 1 if( clk_per_sample > 1 ) else 1
+
+# {sign, x[W-2:0]} of the rotator output, two bits below the sign are dropped
+def discard_msb( x, W ):
+    return ( x & ( 2**(W-1) - 1 ) ) - np.where( x < 0, 2**(W-1), 0 )
+
+
+# Model spectrogram ( T, M ) lined up with the DUT output stream: every
+# block comes one sample later, the first one is empty. Hann neighbours
+# across back to back blocks are not reproduced, the model windows every
+# spectrum by itself
+def align( y ):
+    y = np.asarray( y )
+    return np.concatenate( ( np.zeros_like( y[:1] ), y[:-1] ) )
+
+
+class SdftDefaultEmu:
+    def __init__( self, N, DW=16, CW=16, IDW=32, IMAG_EN=1, HANNING_EN=0, FIX_EN=1,
+                  FIX=None, SPECTRUM="full", REGISTER_EN=0, period=None ):
+        if( N & (N-1) ):
+            print( "SdftDefaultEmu : N must be a power of 2" )
+            exit()
+        self.N           = N
+        self.DW          = DW
+        self.CW          = CW
+        self.IDW         = IDW
+        self.IMAG_EN     = IMAG_EN
+        self.HANNING_EN  = HANNING_EN
+        self.FIX_EN      = FIX_EN
+        self.FIX         = 2**(DW-1)-1 if( FIX is None ) else FIX
+        self.REGISTER_EN = REGISTER_EN
+        self.M           = N if( SPECTRUM=="full" ) else N//2
+        self.period      = self.block_cycles() if( period is None ) else period
+        if( self.period < self.block_cycles() ):
+            print( f"SdftDefaultEmu : period {self.period} is less than block length {self.block_cycles()}, blocks overrun" )
+            exit()
+        w = twiddle_generator_int( N, 'inverse', CW )[:self.M]
+        self.w_re = w.real.astype( np.int64 )
+        self.w_im = w.imag.astype( np.int64 )
+        if( FIX_EN ):
+            self.w_re = ( self.w_re * self.FIX ) >> (DW-1)
+            self.w_im = ( self.w_im * self.FIX ) >> (DW-1)
+
+    # One rotator walks all M bins
+    def block_cycles( self ):
+        return self.M
+
+    # Clocks from the tick of sample n to the first / last bin of the block
+    # that carries its spectrum, and the fastest tick rate
+    def timing( self, f_clk=None ):
+        B     = self.block_cycles()
+        delay = 1 + self.HANNING_EN + self.REGISTER_EN
+        t = { "block_cycles"      : B,
+              "min_period"        : B,
+              "period"            : self.period,
+              "bin_latency"       : delay,
+              "spectrum_latency"  : self.period + delay,
+              "last_bin_latency"  : self.period + delay + B - 1,
+              "duty"              : B / self.period }
+        if( f_clk is not None ):
+            t["max_sample_rate"] = f_clk / B
+            t["sample_rate"]     = f_clk / self.period
+            t["latency_s"]       = ( self.period + delay ) / f_clk
+        return t
+
+    # Datapath without hanning_fd: ( T, M ) product_mem content every block
+    # puts out (re, im) and ( T, M ) sat_alarm, bins saturated by the comb
+    # sum. x is the stimulus as it goes to data_i (truncated to integers)
+    def blocks( self, x ):
+        x = np.trunc( np.asarray( x ) ).astype( np.int64 )
+        if( len(x) and ( x.min() < -2**(self.DW-1) or x.max() > 2**(self.DW-1)-1 ) ):
+            print( f"SdftDefaultEmu : stimulus doesn't fit {self.DW} bits" )
+            exit()
+        T, M  = len(x), self.M
+        xz    = DelayLine( self.N ).block( x ) # xz_mem, addressed by sample
+        if( self.FIX_EN ):
+            xz = ( xz * self.FIX ) >> (self.DW-1)
+        comb  = x - xz
+        out_re    = np.zeros( ( T, M ), dtype=np.int64 )
+        out_im    = np.zeros( ( T, M ), dtype=np.int64 )
+        sat_alarm = np.zeros( ( T, M ), dtype=bool )
+        y_re      = np.zeros( M, dtype=np.int64 ) # product_mem
+        y_im      = np.zeros( M, dtype=np.int64 )
+        for n in range( T ):
+            out_re[n], out_im[n] = y_re, y_im
+            y_comb_re, _, sat_alarm[n] = sat_array( y_re + comb[n], self.IDW )
+            y_re, y_im = rotator_int( y_comb_re, y_im, self.w_re, self.w_im, self.CW, 'half_up' )
+            y_re, y_im = discard_msb( y_re, self.IDW ), discard_msb( y_im, self.IDW )
+        return out_re, out_im, sat_alarm
+
+    # Returns the valid_o stream: re, im (None without IMAG_EN), cycle, sob,
+    # eob of every valid output in order, and sat_alarm per block: one bin
+    # a clock, so number of clocks with sat_alarm_o
+    def run( self, x ):
+        out_re, out_im, sat_alarm = self.blocks( x )
+        T, M = out_re.shape
+        if( self.HANNING_EN ):
+            # Back to back blocks make one continuous stream for hanning_fd
+            shape  = ( 1, T*M ) if( self.period == M ) else ( T, M )
+            out_re = window_fd( out_re.reshape( shape ), 'hann', fixed=True )
+            out_im = window_fd( out_im.reshape( shape ), 'hann', fixed=True )
+        k     = np.arange( M )
+        cycle = np.add.outer( np.arange( T ) * self.period, k ) + self.timing()["bin_latency"]
+        return { "re"        : out_re.ravel(),
+                 "im"        : out_im.ravel() if( self.IMAG_EN ) else None,
+                 "cycle"     : cycle.ravel(),
+                 "sob"       : np.tile( k == 0,   T ),
+                 "eob"       : np.tile( k == M-1, T ),
+                 "sat_alarm" : sat_alarm.sum( axis=1 ) }
+
+
+if __name__ == "__main__":
+    N      = int( sys.argv[1] )   if( len( sys.argv ) > 1 ) else 256
+    T      = int( sys.argv[2] )   if( len( sys.argv ) > 2 ) else N*30
+    f_clk  = float( sys.argv[3] ) if( len( sys.argv ) > 3 ) else 100e6
+
+    from time import perf_counter
+    rng = np.random.default_rng( 1 )
+    x   = np.clip( rng.normal( 0.0, 2**15 / 8, T ), -2**15, 2**15-1 )
+    emu = SdftDefaultEmu( N, DW=16, CW=16, IDW=32, period=tb_period( N+1 ) )
+    t0  = perf_counter()
+    out = emu.run( x )
+    t1  = perf_counter()
+    print( f"N={N} T={T}: {len(out['re'])} outputs in {t1-t0:.2f} s, "
+           f"last valid_o at cycle {out['cycle'][-1]}, sat_alarm clocks {out['sat_alarm'].sum()}" )
+    for name, value in emu.timing( f_clk ).items():
+        print( f"{name:17} : {value}" )
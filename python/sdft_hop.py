@@ -0,0 +1,159 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+#
+# Sdft with hop size: a spectrum of the last N samples every hop samples.
+# Sliding recursion costs O(N) per input sample no matter how rarely spectra
+# are needed, FFT of the window costs O(N log N) per spectrum, so for long
+# hops it's cheaper to do batched FFTs of the windows (as sliding_fft_td()
+# does for reference). The engine switches to FFT when hop >= crossover, which
+# is measured on this host by calibrate_crossover() unless given.
+#
+# Both modes share the delay line of the underlying Sdft. FFT mode keeps it
+# updated and only marks the recursion state stale; the sliding mode restores
+# it with one FFT of the delay line contents before going on. So set_hop()
+# could be called between any blocks. Hop is counted from the moment it is
+# set: the first spectrum after set_hop( H ) is H samples later.
+#
+# Usage:
+#
+#   sdft = SdftHop( 1024, hop=256 )
+#   y    = sdft.process( x ) # ( len(x) // 256, 1024 )
+#
+# Running the script prints crossover and per sample cost of both modes:
+# python3 sdft_hop.py [N]
+
+
+import numpy as np
+import sys
+from time import perf_counter
+from functools import lru_cache
+from numpy.lib.stride_tricks import sliding_window_view
+from models import Sdft
+from utility_functions import cmul
+from utility_functions import FD_CHUNK
+
+# Seconds per input sample of the sliding recursion and per spectrum of the
+# batched FFT, T samples of noise each
+def measure( N, T ):
+    x  = np.random.default_rng( 0 ).normal( 0., 1., T )
+    t0 = perf_counter()
+    SdftHop( N, hop=1, crossover=np.inf ).process( x )
+    t1 = perf_counter()
+    SdftHop( N, hop=1, crossover=1 ).process( x )
+    t2 = perf_counter()
+    return ( t1 - t0 ) / T, ( t2 - t1 ) / T
+
+# Hop where one FFT spectrum costs as much as hop sliding updates
+@lru_cache( maxsize=16 )
+def calibrate_crossover( N, T=None ):
+    T = max( 256, 2**18 // N ) if( T is None ) else T
+    sliding, fft = measure( N, T )
+    return max( 1, int( np.ceil( fft / sliding ) ) )
+
+
+class SdftHop:
+    def __init__( self, N, hop=1, crossover=None ):
+        self.N         = N
+        self.sdft      = Sdft( N )
+        self.crossover = calibrate_crossover( N ) if( crossover is None ) else crossover
+        self.stale     = False
+        self.set_hop( hop )
+
+    def set_hop( self, hop ):
+        if( hop < 1 ):
+            print( "Error, hop must be positive" )
+            exit()
+        self.hop   = hop
+        self.mode  = 'fft' if( hop >= self.crossover ) else 'sliding'
+        self.count = 0 # samples since the last spectrum
+
+    # Recursion state from the delay line, it's the FFT of the current window
+    def resync( self ):
+        self.sdft.y_prev = np.fft.fft( self.sdft.x.history() )
+        self.stale       = False
+
+    def sliding( self, x, frames ):
+        if( self.stale ):
+            self.resync()
+        comb   = x - self.sdft.x.block( x )
+        y      = np.zeros( ( len(frames), self.N ), dtype=complex )
+        y_prev = self.sdft.y_prev
+        j      = 0
+        for t in range( len(x) ):
+            np.add( y_prev, comb[t], out=y_prev )
+            cmul( y_prev, self.sdft.w, out=y_prev )
+            if( j < len(frames) and t == frames[j] ):
+                y[j] = y_prev
+                j   += 1
+        return y
+
+    # Windows are a strided view over the last N-1 samples and the block, only
+    # the ones with spectra are copied, FD_CHUNK elements at a time
+    def fft( self, x, frames ):
+        seg  = np.concatenate( ( self.sdft.x.history()[1:], x ) )
+        wx   = sliding_window_view( seg, self.N )
+        y    = np.zeros( ( len(frames), self.N ), dtype=complex )
+        rows = max( 1, FD_CHUNK // self.N )
+        for i in range( 0, len(frames), rows ):
+            y[i:i+rows] = np.fft.fft( wx[frames[i:i+rows]] )
+        self.sdft.x.block( x )
+        self.stale = True
+        return y
+
+    # Returns ( spectra, N ), one for every hop-th sample of the stream
+    def process( self, block ):
+        x          = np.asarray( block, dtype=float )
+        frames     = np.arange( self.hop - self.count - 1, len(x), self.hop )
+        self.count = ( self.count + len(x) ) % self.hop
+        if( self.mode == 'sliding' ):
+            return self.sliding( x, frames )
+        return self.fft( x, frames )
+
+
+if __name__ == "__main__":
+    N = int( sys.argv[1] ) if( len( sys.argv ) > 1 ) else 1024
+
+    sliding, fft = measure( N, max( 256, 2**18 // N ) )
+    print( f"N={N}" )
+    print( f"sliding   : {sliding*1e6:.3f} us per sample" )
+    print( f"fft       : {fft*1e6:.3f} us per spectrum" )
+    print( f"crossover : hop {calibrate_crossover( N )}" )
+
+    # Same stream through both modes and hop changes against plain Sdft
+    x   = np.random.default_rng( 1 ).normal( 0., 1., 8*N )
+    ref = Sdft( N ).process( x )
+    err = 0.
+    for crossover in ( 1, np.inf, 8 ):
+        sdft = SdftHop( N, crossover=crossover )
+        t    = 0
+        for hop, n in ( ( 1, N//2 ), ( 16, 3*N ), ( 3, N ), ( 64, 3*N+N//2 ) ):
+            sdft.set_hop( hop )
+            y    = sdft.process( x[t:t+n] )
+            idx  = np.arange( t + hop - 1, t + n, hop )
+            err  = max( err, np.max( np.abs( y - ref[idx] ) ) )
+            t   += n
+    print( f"max deviation from Sdft with hop changes : {err:.3e}" )
@@ -0,0 +1,150 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+#
+# P-lane variant of ../rtl/sdft_default.sv: bins are interleaved across P
+# rotators, lane p handles bins p, p+P, p+2P, ... and keeps them in its own
+# product_mem and twiddle ROM banks (M/P words each). xz_mem, comb and FIX of
+# the input are shared, every lane gets the same comb. Bins are independent
+# recursions, so every lane computes exactly what the single rotator does for
+# these bins; a block takes M/P clocks instead of M, and sample rate goes up
+# P times.
+#
+# SdftLanesEmu is SdftDefaultEmu with P lanes: run() gives ( cycles, P )
+# streams, column p is lane p, row j of block n is bin j*P + p, sat_alarm
+# is the same ( cycles, P ) shape, one flag per lane every clock (OR the row
+# for a single sat_alarm_o). Hann is
+# applied within every block (zero neighbours at the edges), a P-lane
+# hanning_fd would take neighbours from the adjacent lanes of the same and
+# adjacent words. write_lane_vectors() writes per-lane reference vectors,
+# lane_report() prints throughput, RAM banking and multiplier count for a set
+# of P. M9K blocks are counted for the ram.sv default RAMSTYLE.
+#
+#   python3 sdft_lanes.py [N] [f_clk]
+
+
+import numpy as np
+import sys
+from models import SdftIntExact
+from sdft_default_emu import SdftDefaultEmu
+from sdft_default_emu import align
+from utility_functions import window_fd
+from utility_functions import write_vector
+
+# ( depth, width ) configurations of one M9K block
+M9K = ( ( 8192, 1 ), ( 4096, 2 ), ( 2048, 4 ), ( 1024, 9 ), ( 512, 18 ), ( 256, 36 ) )
+
+def m9k_blocks( depth, width ):
+    return min( -(-depth // d) * -(-width // w) for d, w in M9K )
+
+
+class SdftLanesEmu( SdftDefaultEmu ):
+    def __init__( self, N, P, **kwargs ):
+        M = N if( kwargs.get( "SPECTRUM", "full" )=="full" ) else N//2
+        if( P < 1 or M % P ):
+            print( f"SdftLanesEmu : P must divide the number of bins {M}" )
+            exit()
+        self.P = P
+        super().__init__( N, **kwargs )
+
+    # Every lane walks its M/P bins
+    def block_cycles( self ):
+        return self.M // self.P
+
+    def run( self, x ):
+        out_re, out_im, sat_alarm = self.blocks( x )
+        T, M = out_re.shape
+        B    = self.block_cycles()
+        if( self.HANNING_EN ):
+            out_re = window_fd( out_re, 'hann', fixed=True )
+            out_im = window_fd( out_im, 'hann', fixed=True )
+        j     = np.arange( B )
+        cycle = np.add.outer( np.arange( T ) * self.period, j ) + self.timing()["bin_latency"]
+        return { "re"        : out_re.reshape( T*B, self.P ),
+                 "im"        : out_im.reshape( T*B, self.P ) if( self.IMAG_EN ) else None,
+                 "cycle"     : cycle.ravel(),
+                 "sob"       : np.tile( j == 0,   T ),
+                 "eob"       : np.tile( j == B-1, T ),
+                 "sat_alarm" : sat_alarm.reshape( T*B, self.P ) }
+
+    # Hardware cost: P rotators of 4 IDW x CW multipliers, FIX multipliers of
+    # the twiddles per lane and the shared one of xz, P banks of product_mem
+    # and twiddle ROM, the shared xz_mem
+    def resources( self, f_clk=None, external_twiddles=False ):
+        B = self.block_cycles()
+        r = { "P"                 : self.P,
+              "block_cycles"      : B,
+              "rotator_mults"     : 4 * self.P,
+              "fix_mults"         : ( 2 * self.P + 1 ) if( self.FIX_EN ) else 0,
+              "product_mem_banks" : ( self.P, B, 2*self.IDW ),
+              "twiddle_rom_banks" : ( 0, B, 2*self.CW ) if( external_twiddles ) else ( self.P, B, 2*self.CW ),
+              "xz_mem"            : ( 1, self.N, self.DW ) }
+        r["ram_bits"] = sum( n * d * w for n, d, w in ( r["product_mem_banks"], r["twiddle_rom_banks"], r["xz_mem"] ) )
+        r["m9k"]      = sum( n * m9k_blocks( d, w ) for n, d, w in ( r["product_mem_banks"], r["twiddle_rom_banks"], r["xz_mem"] ) )
+        if( f_clk is not None ):
+            r["max_sample_rate"] = f_clk / B
+        return r
+
+
+# prefix_re_lane<p> / prefix_im_lane<p> for every lane, width is the output width
+def write_lane_vectors( prefix, out, width, fmt='binary' ):
+    ext = ".txt" if( fmt=="text" ) else ".bin"
+    for p in range( out["re"].shape[1] ):
+        write_vector( f"{prefix}_re_lane{p}{ext}", out["re"][:,p], width, fmt )
+        if( out["im"] is not None ):
+            write_vector( f"{prefix}_im_lane{p}{ext}", out["im"][:,p], width, fmt )
+
+
+def lane_report( N, lanes, f_clk=100e6, **kwargs ):
+    print( "%5s %8s %14s %6s %6s %14s %14s %10s %6s" %
+           ( "P", "clk/smp", "max rate, Hz", "mults", "fix", "product_mem", "twiddle_rom", "RAM bits", "M9K" ) )
+    for P in lanes:
+        r = SdftLanesEmu( N, P, **kwargs ).resources( f_clk )
+        bank = lambda b : "%dx%dx%d" % b
+        print( "%5d %8d %14.0f %6d %6d %14s %14s %10d %6d" %
+               ( P, r["block_cycles"], r["max_sample_rate"], r["rotator_mults"], r["fix_mults"],
+                 bank( r["product_mem_banks"] ), bank( r["twiddle_rom_banks"] ), r["ram_bits"], r["m9k"] ) )
+
+
+if __name__ == "__main__":
+    N     = int( sys.argv[1] )   if( len( sys.argv ) > 1 ) else 4096
+    f_clk = float( sys.argv[2] ) if( len( sys.argv ) > 2 ) else 100e6
+
+    lanes = [ 2**i for i in range( 7 ) if N % 2**i == 0 ]
+    print( f"N={N} DW=16 CW=16 IDW=32 f_clk={f_clk:.0f} Hz" )
+    lane_report( N, lanes, f_clk, DW=16, CW=16, IDW=32 )
+
+    # Lanes put together against the integer model (no FIX, RTL rounding),
+    # one block later as the DUT puts it out
+    n   = 64
+    x   = np.clip( np.random.default_rng( 1 ).normal( 0.0, 2**12, n*8 ), -2**15, 2**15-1 )
+    ref = SdftIntExact( n, bitwidth=16, hanning_en=True, rounding='half_up' ).process( np.trunc( x ) )
+    ok  = True
+    for P in [ P for P in lanes if n % P == 0 ]:
+        out = SdftLanesEmu( n, P, HANNING_EN=1, FIX_EN=0 ).run( x )
+        ok &= np.array_equal( out["re"].reshape( -1, n ), align( ref[0] ) )
+        ok &= np.array_equal( out["im"].reshape( -1, n ), align( ref[1] ) )
+    print( f"bit exact with SdftIntExact (N={n}, FIX_EN=0) : {ok}" )
@@ -45,23 +45,19 @@ x = np.random.randint( min_val//32, max_val//32, N )
 sdft      = SdftInt    ( R, bitwidth=DW, hanning_en=False )
 sdft_real = SdftIntReal( R, bitwidth=DW, hanning_en=False )
 
-ref    = np.array( [ sdft(x[i])        for i in range(N) ] )
-f_half = np.array( [ sdft_real( x[i] ) for i in range(N) ] )
+ref    = sdft.process( x )
+f_half = sdft_real.process( x )
 
-f = np.zeros( ( f_half.shape[0], f_half.shape[1]*2 ), dtype=float )
-
-for i in range( len( f_half ) ):
-    # We lose N/2 bin because we want to calculate N/2 bins, not N/2+1
-    # to reduce complexity. One additional bin would cost non-proportional
-    # recource utilization increasing. It is reasonable tradeoff.
-    #
-    # tmp = np.append( f_half[i].real, 0 )
-    #
-    # But, because we aware of that, we don't take this as an error. We need to
-    # find some real (unexpected) errors, so we loan this bin value from
-    # reference.
-    tmp = np.append( f_half[i], ref[i].real[R//2] )
-    f[i] = np.append( tmp, f_half[i][:0:-1] )
+# We lose N/2 bin because we want to calculate N/2 bins, not N/2+1
+# to reduce complexity. One additional bin would cost non-proportional
+# recource utilization increasing. It is reasonable tradeoff.
+#
+# f = half_to_full_fd( f_half )
+#
+# But, because we aware of that, we don't take this as an error. We need to
+# find some real (unexpected) errors, so we loan this bin value from
+# reference.
+f = half_to_full_fd( f_half, ref.real[:,R//2] )
 
 
 #ref = hanning_fd     ( ref, N, R )
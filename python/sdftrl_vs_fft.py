@@ -44,11 +44,10 @@ max_val =  2**(DW-1)-1
 x = np.random.randint( min_val//32, max_val//32, N )
 sdft = SdftIntRL( R, bitwidth=DW, hanning_en=False )
 
-# rectangle window (default)
-wx = np.array( [ np.append([0.]*(R-1),x)[i:i+R] for i in range(N) ] )
-#wx = hanning_td( wx, R )
-ref = np.array( [ np.fft.fft( wx[i] ) for i in range(N) ] )
-f   = np.array( [ sdft(x[i])          for i in range(N) ] )
+# rectangle window (default), hanning_en=True for Hann. The generator yields
+# reference by chunks, they're gathered here because N is small
+ref = np.concatenate( list( sliding_fft_td( x, R, hanning_en=False ) ) )
+f   = sdft.process( x )
 
 #ref = complex_to_real( ref, N, R )
 #f   = complex_to_real( f,   N, R )
@@ -0,0 +1,68 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+#
+# Accuracy versus cost of the single block inverse transform (Ssidft, SsidftInt)
+# against the exact one (Sidft). All of them get the same spectrogram and are
+# compared with the stimulus delayed by their own latency: Sidft restores the
+# oldest sample of the window, SSIDFT the middle one. First N outputs (window
+# is not filled yet) are skipped. Time is per output sample
+
+
+import numpy as np
+from time import perf_counter
+from models import SdftInt, Sidft, Ssidft, SsidftInt
+
+DW = 16
+CW = 24 # SdftInt precision, spectrogram noise is the floor for all of them
+R  = 2**10 # RADIX
+N  = 2**13 # Amount of test samples
+
+rng = np.random.default_rng( 1 )
+x   = np.clip( rng.normal( 0., 2**(DW-1) / 4, N ), -2**(DW-1), 2**(DW-1)-1 )
+x   = np.fix( x )
+
+F = SdftInt( R, bitwidth=CW ).process( x )
+
+def run( model ):
+    t0 = perf_counter()
+    y  = model.process( F )
+    return y, ( perf_counter() - t0 ) / N
+
+def errors( y, delay ):
+    t   = np.arange( R, N )
+    err = y[R:] - x[t-delay]
+    nmse = 10 * np.log10( np.sum( err**2 ) / np.sum( x[t-delay]**2 ) )
+    return nmse, np.max( np.abs( err ) )
+
+print( "N = %d, %d samples, DW = %d, CW = %d" % ( R, N, DW, CW ) )
+print( "%-10s %14s %12s %16s" % ( "", "time/sample", "NMSE", "peak error, LSB" ) )
+for name, model, delay in ( ( "Sidft",     Sidft( R ),     R-1    ),
+                            ( "Ssidft",    Ssidft( R ),    R//2-1 ),
+                            ( "SsidftInt", SsidftInt( R ), R//2-1 ) ):
+    y, t = run( model )
+    nmse, peak = errors( y, delay )
+    print( "%-10s %11.3f us %9.2f dB %16.2f" % ( name, t*1e6, nmse, peak ) )
@@ -30,25 +30,84 @@
 # _td = time domain functions, _fd = frequency domain functions
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from functools import lru_cache
 
+# Twiddles are memoized per ( N, order, bitwidth ), every model constructor asks
+# for them. Callers get a copy, so the cached table can't be spoiled
 def twiddle_generator( N, order='forward' ):
-    w = np.zeros( N, dtype=complex )
-    for n in range(N):
-        fi = -2 * np.pi * n / N if( order=='forward' ) else 2 * np.pi * n / N
-        w[n] = complex( np.cos(fi), np.sin(fi) )
-    return w
+    return twiddle_table( N, order ).copy()
 
 
 def twiddle_generator_int( N, order='forward', bitwidth=32 ):
-    w = np.zeros( N, dtype=complex )
+    return twiddle_table_int( N, order, bitwidth ).copy()
+
+
+@lru_cache( maxsize=64 )
+def twiddle_table( N, order ):
+    n  = np.arange( N )
+    fi = -2 * np.pi * n / N if( order=='forward' ) else 2 * np.pi * n / N
+    w  = np.zeros( N, dtype=complex )
+    w.real = np.cos( fi )
+    w.imag = np.sin( fi )
+    return w
+
+
+# Every sin/cos value is rounded directly. This is the reference the
+# quarter-wave model (quarter_wave_twiddles) is checked against, so it must
+# not be built from it
+@lru_cache( maxsize=64 )
+def twiddle_table_int( N, order, bitwidth ):
     min_val = -2**(bitwidth-1)
     max_val =  2**(bitwidth-1)-1
-    for n in range(N):
-        fi = -2 * np.pi * n / N if( order=='forward') else 2 * np.pi * n / N
-        re = np.clip( round( np.cos(fi) * 2**(bitwidth-1)), min_val, max_val )
-        im = np.clip( round( np.sin(fi) * 2**(bitwidth-1)), min_val, max_val )
-        w[n] = complex( re, im )
-        #w[n] = complex( re, im )
+    n  = np.arange( N )
+    fi = -2 * np.pi * n / N if( order=='forward') else 2 * np.pi * n / N
+    w  = np.zeros( N, dtype=complex )
+    re = np.round( np.cos(fi) * 2**(bitwidth-1) ).astype( np.int64 )
+    im = np.round( np.sin(fi) * 2**(bitwidth-1) ).astype( np.int64 )
+    w.real = np.clip( re, min_val, max_val )
+    w.imag = np.clip( im, min_val, max_val )
+    return w
+
+
+# Quarter-wave twiddle ROM: round( sin( 2*pi*k/N ) * 2**(bitwidth-1) ), k = [0:N/4),
+# unsigned, bitwidth wide (a value could round up to 2**(bitwidth-1)). It's
+# bitwidth*N/4 bits instead of bitwidth*2*N for the full complex table
+def quarter_wave_rom( N, bitwidth ):
+    if( N % 4 != 0 ):
+        print( "quarter_wave_rom : N must be a multiple of 4" )
+        exit()
+    k = np.arange( N//4 )
+    return np.round( np.sin( 2 * np.pi * k / N ) * 2**(bitwidth-1) ).astype( np.int64 )
+
+
+# Model of the quadrant logic around quarter-wave ROM. For index n:
+#
+#   quadrant = n / (N/4), r = n % (N/4)
+#   address  = r for quadrants 0, 2 and N/4-r for 1, 3 (sin( pi - x ) = sin( x ))
+#   sin      = rom[address], address N/4 is not stored, it's 1.0 (2**(bitwidth-1))
+#   sign     = minus for quadrants 2, 3 (sin( x + pi ) = -sin( x ))
+#
+# cos( x ) is sin( x + pi/2 ), i.e. the same with index n + N/4. Forward twiddles
+# take negative sin. Then both are clipped to bitwidth signed (cos(0) = 1.0
+# doesn't fit). Should reproduce twiddle_generator_int( N, order, bitwidth ),
+# twiddle_generator.py checks it
+def quarter_wave_twiddles( rom, N, order, bitwidth ):
+    Q       = N // 4
+    min_val = -2**(bitwidth-1)
+    max_val =  2**(bitwidth-1)-1
+    full    = np.append( rom, 2**(bitwidth-1) )
+    def sin( n ):
+        quadrant = n // Q
+        r        = n % Q
+        address  = np.where( quadrant % 2 == 0, r, Q - r )
+        return np.where( quadrant < 2, full[address], -full[address] )
+    n  = np.arange( N )
+    re = sin( ( n + Q ) % N )
+    im = sin( n ) if( order!='forward' ) else -sin( n )
+    w  = np.zeros( N, dtype=complex )
+    w.real = np.clip( re, min_val, max_val )
+    w.imag = np.clip( im, min_val, max_val )
     return w
 
 
@@ -61,6 +120,101 @@ def sat( x, target_bitwidth ):
     return x
 
 
+# Array version of sat (../rtl/sat.sv) for model instrumentation. Returns
+# clipped values, number of saturated elements and their mask. out could be x
+# itself (or its .real view) to saturate in place
+def sat_array( x, target_bitwidth, out=None ):
+    lowerbound, upperbound = -2**(target_bitwidth-1), 2**(target_bitwidth-1)-1
+    mask = ( x < lowerbound ) | ( x > upperbound )
+    y    = np.clip( x, lowerbound, upperbound, out=out )
+    return y, int( np.count_nonzero( mask ) ), mask
+
+
+# Complex product with real and imaginary parts computed as (ac - bd) and
+# (ad + bc) with every product rounded separately, as scalar complex
+# multiplication does. Vectorized complex multiply may use FMA instructions
+# and then results differ in the last bit once products exceed 53 bits
+def cmul( a, b, out=None ):
+    if( out is None ):
+        out = np.empty( np.broadcast( a, b ).shape, dtype=complex )
+    re       = a.real * b.real - a.imag * b.imag
+    out.imag = a.real * b.imag + a.imag * b.real
+    out.real = re
+    return out
+
+# Integer model of ../rtl/rotator.sv, vectorized over bins:
+#
+#   y = ( x_re + j*x_im ) * ( c_re + j*c_im ) / 2**(cw-1)
+#
+# x_* are int64 arrays, c_* are cw bit twiddles (cw <= 32). Products are exact,
+# the result is rounded either half up, as the rotator does it (add the bit
+# right below the discarded ones), or half to even, as np.round() does it in
+# SdftInt. The rotator's output MSB discard is not modeled, the result keeps
+# as many bits as needed.
+#
+# While the products fit 62 bits they are computed in int64 directly. Above
+# that x is split into a 31 bit low part and the rest, and every product is
+# kept as a pair of int64 limbs ( hi * 2**31 + lo ). This is still exact and
+# vectorized, and works for |x| < 2**61
+ROTATOR_SPLIT = 31
+
+def rotator_int( x_re, x_im, c_re, c_im, cw, rounding='half_even' ):
+    if( rounding not in { 'half_even', 'half_up' } ):
+        print( "rotator_int : rounding could be either 'half_even' or 'half_up'" )
+        exit()
+    if( cw < 2 or cw > 32 ):
+        print( "rotator_int : cw must be in [2:32] range" )
+        exit()
+    k    = cw - 1
+    bits = max( int( np.abs( x_re ).max( initial=0 ) ),
+                int( np.abs( x_im ).max( initial=0 ) ) ).bit_length()
+    if( bits + cw <= 62 ):
+        re = x_re * c_re - x_im * c_im
+        im = x_re * c_im + x_im * c_re
+        return round_shift( re >> k, re & ((1<<k)-1), k, rounding ), \
+               round_shift( im >> k, im & ((1<<k)-1), k, rounding )
+    if( bits > 61 ):
+        print( "rotator_int : value doesn't fit 61 bit, can't rotate it exactly" )
+        exit()
+    S    = ROTATOR_SPLIT
+    mask = (1<<S) - 1
+    re_hi, re_lo = x_re >> S, x_re & mask
+    im_hi, im_lo = x_im >> S, x_im & mask
+    # re = hi * 2**S + lo, then carry from lo to hi to make 0 <= lo < 2**S
+    hi  = re_hi * c_re - im_hi * c_im
+    lo  = re_lo * c_re - im_lo * c_im
+    hi += lo >> S
+    lo &= mask
+    y_re = round_shift( ( hi << (S-k) ) + ( lo >> k ), lo & ((1<<k)-1), k, rounding )
+    hi  = re_hi * c_im + im_hi * c_re
+    lo  = re_lo * c_im + im_lo * c_re
+    hi += lo >> S
+    lo &= mask
+    y_im = round_shift( ( hi << (S-k) ) + ( lo >> k ), lo & ((1<<k)-1), k, rounding )
+    return y_re, y_im
+
+
+# q is the value shifted right by k (floor), rem is the k discarded bits
+def round_shift( q, rem, k, rounding ):
+    half = 1 << (k-1)
+    if( rounding == 'half_up' ):
+        return q + ( rem >= half )
+    return q + ( ( rem > half ) | ( ( rem == half ) & ( ( q & 1 ) == 1 ) ) )
+
+
+# Rows of ( T, R ) processed at once by the _fd metrics. Bounds temporary
+# arrays when spectrograms are large
+FD_CHUNK = 2**20
+
+# acc + v[0] + v[1] + ... strictly one by one in row-major order (that's what
+# np.add.accumulate() does, unlike np.sum() which sums pairwise), so the result
+# is the same double as the plain Python accumulation gives. v is a temporary,
+# it's overwritten
+def seq_sum( acc, v ):
+    v     = v.ravel()
+    v[0] += acc
+    return np.add.accumulate( v, out=v )[-1]
+
 def nmse_fd( x, ref, N, R ):
     if( len( x.shape ) != 2 ):
         print( "nmse_fd : wrong data shape" )
@@ -69,40 +223,41 @@ def nmse_fd( x, ref, N, R ):
         print( "nmse_fd : wrong data type" )
         exit()
     nmse = lambda a,b : 0. if any( [a==0, b==0] ) else 10 * np.log10( a / b )
+    rows = max( 1, FD_CHUNK // R )
     if( type( x[0,0] ) == np.float64 ):
         error_acc = 0
         ref_acc   = 0
-        for t in range(N):
-            for k in range(R):
-                error_acc += ( x[t,k]- ref[t,k] )**2
-                ref_acc   += ref[t,k]**2
+        for t in range( 0, N, rows ):
+            xc, rc = x[t:min(t+rows,N),:R], ref[t:min(t+rows,N),:R]
+            error_acc = seq_sum( error_acc, ( xc - rc )**2 )
+            ref_acc   = seq_sum( ref_acc,   rc**2 )
         return nmse( error_acc, ref_acc), 0.
     error_re_acc = 0
     error_im_acc = 0
     ref_re_acc   = 0
     ref_im_acc   = 0
-    for t in range(N):
-        for k in range(R):
-            error_re_acc += ( x[t,k].real - ref[t,k].real )**2
-            error_im_acc += ( x[t,k].imag - ref[t,k].imag )**2
-            ref_re_acc   += ref[t,k].real**2
-            ref_im_acc   += ref[t,k].imag**2
+    for t in range( 0, N, rows ):
+        xc, rc = x[t:min(t+rows,N),:R], ref[t:min(t+rows,N),:R]
+        error_re_acc = seq_sum( error_re_acc, ( xc.real - rc.real )**2 )
+        error_im_acc = seq_sum( error_im_acc, ( xc.imag - rc.imag )**2 )
+        ref_re_acc   = seq_sum( ref_re_acc,   rc.real**2 )
+        ref_im_acc   = seq_sum( ref_im_acc,   rc.imag**2 )
     nmse_re = nmse( error_re_acc, ref_re_acc )
     nmse_im = nmse( error_im_acc, ref_im_acc )
     return nmse_re, nmse_im
 
 
+# np.fmax ignores NaN as "error > peak" comparison does
 def peak_error_fd( x, ref, N, R, DW ):
     peak_error_re = 0
     peak_error_im = 0
-    for t in range(N):
-        for k in range(R):
-            error_re = abs(x[t,k].real - ref[t,k].real)
-            error_im = abs(x[t,k].imag - ref[t,k].imag)
-            if( error_re > peak_error_re ):
-                peak_error_re = error_re
-            if( error_im > peak_error_im ):
-                peak_error_im = error_im
+    rows = max( 1, FD_CHUNK // R )
+    for t in range( 0, N, rows ):
+        xc, rc = x[t:min(t+rows,N),:R], ref[t:min(t+rows,N),:R]
+        error_re = np.abs( xc.real - rc.real )
+        error_im = np.abs( xc.imag - rc.imag )
+        peak_error_re = np.fmax.reduce( error_re, axis=None, initial=peak_error_re )
+        peak_error_im = np.fmax.reduce( error_im, axis=None, initial=peak_error_im )
     return 100*peak_error_re/2**(DW-1), 100*peak_error_im/2**(DW-1)
 
 
@@ -112,52 +267,211 @@ def hanning_td( x, R ):
     return x
 
 
+# FFT of every R samples window of x, zero padded on the left, as SDFT sees
+# them: row t is the spectrum of x[t-R+1:t+1]. Generator, yields spectra of
+# chunk windows at a time, so memory doesn't depend on the signal length.
+# Windows are a strided view over the chunk plus R-1 previous samples, nothing
+# is copied until the optional Hann window is applied. real=True gives rfft,
+# R/2+1 bins
+def sliding_fft_td( x, R, hanning_en=False, real=False, chunk=None ):
+    chunk = max( 1, FD_CHUNK // R ) if( chunk is None ) else chunk
+    fft   = np.fft.rfft if( real ) else np.fft.fft
+    tail  = np.zeros( R-1 )
+    for t in range( 0, len(x), chunk ):
+        seg  = np.concatenate( ( tail, x[t:t+chunk] ) )
+        wx   = sliding_window_view( seg, R )
+        if( hanning_en ):
+            wx = hanning_td( wx, R )
+        yield fft( wx )
+        tail = seg[len(seg)-(R-1):]
+
+
+# Cosine-sum windows applied in frequency domain: window in time is
+# a0 - a1*cos + a2*cos(2x), so in frequency it's the kernel
+#
+#   y[k] = a0*x[k] - a1/2*( x[k-1] + x[k+1] ) + a2/2*( x[k-2] + x[k+2] )
+#
+# Taps are ( a0, -a1/2[, a2/2] ). Bins outside [0:R) are zeros, as they are for
+# ../rtl/hanning_fd.sv, which has 'hann' only
+WINDOWS = { 'hann'     : ( 0.5,  -0.25 ),
+            'hamming'  : ( 0.54, -0.23 ),
+            'blackman' : ( 0.42, -0.25, 0.04 ) }
+
+# Tap c as a sum of signed powers of two: ( ( sign, shift ), ... ) where
+# c ~ sum( sign * 2**-shift ). Every term is the nearest one to what is left of
+# c, at most terms of them and shifts up to max_shift. That's the shift-and-add
+# constant multiplier, 0.5 and 0.25 of Hann are single terms
+@lru_cache( maxsize=64 )
+def window_terms( c, terms=3, max_shift=16 ):
+    t, rem = [], c
+    for i in range( terms ):
+        if( rem == 0 ):
+            break
+        sign   = 1 if( rem > 0 ) else -1
+        shifts = np.arange( max_shift+1 )
+        shift  = int( shifts[ np.argmin( np.abs( abs( rem ) - 2.**-shifts ) ) ] )
+        t.append( ( sign, shift ) )
+        rem -= sign * 2.**-shift
+    return tuple( t )
+
+# Windowing of the whole ( ..., R ) block along the last axis in one pass.
+# fixed=True takes integer arrays and does what the RTL does: every neighbour
+# is arithmetic shifted by itself, then the terms are added, e.g. for Hann
+#
+#   y[k] = ( x[k] >> 1 ) - ( ( x[k-1] >> 2 ) + ( x[k+1] >> 2 ) )
+#
+# Other windows use window_terms( tap, terms, max_shift ) for the taps. With
+# fixed=False 'hann' is bit exact with the old 0.5*x - 0.25*(...) expression
+def window_fd( x, window='hann', fixed=False, terms=3, max_shift=16 ):
+    if( window not in WINDOWS ):
+        print( "window_fd : unknown window '%s', could be one of %s" % ( window, list( WINDOWS ) ) )
+        exit()
+    taps = WINDOWS[window]
+    P    = len(taps) - 1
+    R    = x.shape[-1]
+    z    = np.zeros( x.shape[:-1] + ( R+2*P, ), dtype=x.dtype )
+    z[...,P:P+R] = x
+    if( not fixed ):
+        y = taps[0] * x
+        for d in range( 1, P+1 ):
+            y = y + taps[d] * ( z[...,P-d:P-d+R] + z[...,P+d:P+d+R] )
+        return y
+    y = np.zeros_like( x )
+    for d in range( P+1 ):
+        for sign, shift in window_terms( taps[d], terms, max_shift ):
+            if( d == 0 ):
+                term = x >> shift
+            else:
+                term = ( z[...,P-d:P-d+R] >> shift ) + ( z[...,P+d:P+d+R] >> shift )
+            y = y + term if( sign > 0 ) else y - term
+    return y
+
+# Sparse window: the result of window_fd() at bins of the R bins spectrum,
+# without the rest of it. window_support() gives the bins this depends on
+# (bins and their neighbours inside [0:R), sorted) and pos, ( K, taps )
+# positions of the neighbours in the support, out of range ones point to
+# a zero column after it
+def window_support( bins, R, window='hann' ):
+    P       = len( WINDOWS[window] ) - 1
+    nb      = np.asarray( bins )[:,np.newaxis] + np.arange( -P, P+1 )
+    valid   = ( nb >= 0 ) & ( nb < R )
+    support = np.unique( nb[valid] )
+    pos     = np.searchsorted( support, nb )
+    pos[~valid] = len( support )
+    return support, pos
+
+# x is ( ..., len(support) ), the terms are added in the same order as
+# window_fd() does, so the result is bit exact with its columns. pos=None
+# means x is the whole spectrum, then it is just window_fd()
+def window_fd_at( x, pos, window='hann' ):
+    if( pos is None ):
+        return window_fd( x, window )
+    taps = WINDOWS[window]
+    P    = len(taps) - 1
+    z    = np.zeros( x.shape[:-1] + ( x.shape[-1]+1, ), dtype=x.dtype )
+    z[...,:-1] = x
+    y = taps[0] * z[...,pos[:,P]]
+    for d in range( 1, P+1 ):
+        y = y + taps[d] * ( z[...,pos[:,P-d]] + z[...,pos[:,P+d]] )
+    return y
+
 def hanning_fd( x, N, R ):
     y = np.zeros_like( x )
-    for t in range(N):
-        y[t,0] = 0.5 * x[t,0] - 0.25 * x[t,1]
-        for n in range(1,R-1):
-            y[t,n] = 0.5 * x[t,n] - 0.25 * ( x[t,n-1] + x[t,n+1] )
-        y[t,R-1] = 0.5 * x[t,R-1] - 0.25 * x[t,R-2]
+    y[:N,:R] = window_fd( x[:N,:R], 'hann' )
+    return y
+
+
+# Full N-point real spectrum from (T, N/2) half spectrum (SdftIntReal output):
+# bins (N/2:N) are [0:N/2) mirrored over N/2. Bin N/2 is not computed by the
+# half spectrum models, so it is taken from nyquist (scalar or (T,) array).
+# The whole block is built with one allocation and three bulk copies
+def half_to_full_fd( x, nyquist=0. ):
+    T, H = x.shape
+    y = np.empty( ( T, 2*H ), dtype=x.dtype )
+    y[:,:H]   = x
+    y[:,H]    = nyquist
+    y[:,H+1:] = x[:,:0:-1]
     return y
 
 
+# Recursion goes along time for all bins at once. As in the original per-bin
+# loop, y[0] takes y[-1] (zeros) as the previous value and the last row is
+# never computed
 def smoothing_fd( x, R, N, a=0.1, b=0.9):
     w = twiddle_generator( R, 'forward' )
     y = np.zeros_like( x, dtype=complex )
-    for n in range(R):
-        y[0,n] = a * x[0,n]
-        for t in range(N-1):
-            y[t,n] = a * x[t,n] + b * y[t-1,n] * w[n]
+    y[0,:R] = a * x[0,:R]
+    for t in range(N-1):
+        y[t,:R] = a * x[t,:R] + cmul( b * y[t-1,:R], w )
     return y
 
 
 def complex_to_real( x, N, R  ):
     y = np.zeros_like( x, dtype=float )
-    for t in range(N):
-        for n in range(R):
-            y[t,n] = x[t,n].real
+    y[:N,:R] = x[:N,:R].real
     return y
 
 
-# Twiddels are complex-valued
+# Test/reference vector for testbenches (../tb/*/tb.sv). Values are truncated
+# to integers as "%d" does and must fit width bits signed. fmt='binary' is
+# fixed-width little-endian: 4 bytes per value up to 32 bits wide, 8 above (see
+# vector_bytes), the whole array goes in one write. fmt='text' is one decimal
+# number per line, as before
+def vector_bytes( width ):
+    return 4 if( width <= 32 ) else 8
+
+
+def write_vector( fname, x, width, fmt='binary' ):
+    if( fmt not in { 'binary', 'text' } ):
+        print( "write_vector : fmt could be either 'binary' or 'text'" )
+        exit()
+    if( width > 64 ):
+        print( "write_vector : width must be 64 or less" )
+        exit()
+    x = np.asarray( x ).ravel()
+    if( x.dtype.kind == 'f' ):
+        x = np.trunc( x )
+    lo, hi = -2**(width-1), 2**(width-1)-1
+    if( len(x) > 0 and ( x.min() < lo or x.max() > hi ) ):
+        print( f"write_vector : {fname} : values don't fit {width} bits" )
+        exit()
+    x = x.astype( np.int64 )
+    if( fmt == 'text' ):
+        np.savetxt( fname, x, fmt="%d" )
+    else:
+        x.astype( f"<i{vector_bytes(width)}" ).tofile( fname )
+
+
+# The other way round, returns int64 array
+def read_vector( fname, width, fmt='binary' ):
+    if( fmt not in { 'binary', 'text' } ):
+        print( "read_vector : fmt could be either 'binary' or 'text'" )
+        exit()
+    if( fmt == 'text' ):
+        return np.atleast_1d( np.loadtxt( fname, dtype=np.int64 ) )
+    return np.fromfile( fname, dtype=f"<i{vector_bytes(width)}" ).astype( np.int64 )
+
+
+# Twiddels are complex-valued. Word is { im, re }, both in cw bit 2's
+# complement
 def twiddles_to_mem( mem_file_name, twiddles, cw, open_flag="w" ):
-    fmt = lambda x : ("0"*int(np.ceil(cw*2/4) - len("%x"%x)) ) + "%x"%x
-    radix = len(twiddles)
-    # Firstly, get 2's complement format
-    re_2sc = np.array([ int(twiddles.real[i]) for i in range(radix) ])
-    im_2sc = np.array([ int(twiddles.imag[i]) for i in range(radix) ])
-    for i in range( radix ):
-        if( re_2sc[i] < 0 ):
-            re_2sc[i] = abs( ( (2**cw-1) ^ re_2sc[i] ) + 1 )
-        if( im_2sc[i] < 0 ):
-            im_2sc[i] = abs( ( (2**cw-1) ^ im_2sc[i] ) + 1 )
-    mem = np.array([ re_2sc[i] + (im_2sc[i] << cw) for i in range( radix ) ])
+    mask = np.uint64( 2**cw - 1 )
+    re   = twiddles.real.astype( np.int64 ).astype( np.uint64 ) & mask
+    im   = twiddles.imag.astype( np.int64 ).astype( np.uint64 ) & mask
+    mem  = re | ( im << np.uint64( cw ) )
+    words_to_mem( mem_file_name, mem, cw*2, open_flag )
+
+
+# Quarter-wave ROM image (see quarter_wave_rom), bitwidth wide unsigned words
+def quarter_wave_to_mem( mem_file_name, rom, bitwidth, open_flag="w" ):
+    words_to_mem( mem_file_name, np.asarray( rom ).astype( np.uint64 ), bitwidth, open_flag )
+
+
+def words_to_mem( mem_file_name, mem, width, open_flag="w" ):
     f  = open( mem_file_name, open_flag )
-    f.write( f"//WIDTH={cw*2};\n")
+    f.write( f"//WIDTH={width};\n")
     f.write( f"//DEPTH={len(mem)};\n")
     f.write( f"//DATA_RADIX=HEX;\n\n")
-    for i in range( len(mem) ):
-        f.write( f"{fmt(mem[i])}\n" )
+    np.savetxt( f, mem, fmt=f"%0{int(np.ceil(width/4))}x" )
     f.close()
 
@@ -0,0 +1,124 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+# Cache of generated test vectors (stimulus + model reference) for the
+# testbench scripts in ../tb. An entry is a directory named by sha256 of the
+# test parameters (model, RADIX, DATA_WIDTH, ... , seed, sample count) and of
+# the sources that produce the vectors: the models (MODEL_SOURCES) and the
+# script generate() comes from (stimulus level, clipping, ...), so any change
+# of them makes old entries unreachable. Arrays are .npy files, they're returned
+# memory mapped read-only. Total size is bounded: when it's exceeded the least
+# recently used entries are removed (every hit touches the entry).
+#
+# Usage:
+#
+#   cache   = VectorCache()
+#   vectors = cache( params, generate ) # generate() returns dict of arrays
+#
+# Location and size bound could be overridden with SDFT_VECTOR_CACHE_DIR and
+# SDFT_VECTOR_CACHE_SIZE (bytes) environment variables.
+
+import numpy as np
+import os
+import shutil
+import hashlib
+import tempfile
+import inspect
+
+PYTHON_DIR = os.path.dirname( os.path.abspath( __file__ ) )
+CACHE_DIR  = os.environ.get( "SDFT_VECTOR_CACHE_DIR",
+                             os.path.join( PYTHON_DIR, "..", ".vector_cache" ) )
+CACHE_SIZE = int( os.environ.get( "SDFT_VECTOR_CACHE_SIZE", 4 * 2**30 ) )
+
+# Reference depends on the models code as much as on the parameters
+MODEL_SOURCES = [ "models.py", "utility_functions.py", "parallel_reference.py" ]
+
+def file_hash( fname ):
+    with open( fname, "rb" ) as f:
+        return hashlib.sha256( f.read() ).hexdigest()
+
+class VectorCache:
+    def __init__( self, cache_dir=CACHE_DIR, max_bytes=CACHE_SIZE ):
+        self.cache_dir = os.path.abspath( cache_dir )
+        self.max_bytes = max_bytes
+        os.makedirs( self.cache_dir, exist_ok=True )
+        h = hashlib.sha256()
+        for src in MODEL_SOURCES:
+            h.update( file_hash( os.path.join( PYTHON_DIR, src ) ).encode() )
+        self.sources_hash = h.hexdigest()
+
+    def key( self, params ):
+        h = hashlib.sha256( self.sources_hash.encode() )
+        for name in sorted( params ):
+            h.update( f"{name}={params[name]!r};".encode() )
+        return h.hexdigest()
+
+    def get( self, params ):
+        path = os.path.join( self.cache_dir, self.key( params ) )
+        if( not os.path.isdir( path ) ):
+            return None
+        os.utime( path )
+        return { f[:-4] : np.load( os.path.join( path, f ), mmap_mode='r' )
+                 for f in sorted( os.listdir( path ) ) if f.endswith( ".npy" ) }
+
+    # Entry is written into a temporary directory and then renamed, so
+    # concurrent runs never see a half written entry
+    def put( self, params, arrays ):
+        path = os.path.join( self.cache_dir, self.key( params ) )
+        tmp  = tempfile.mkdtemp( dir=self.cache_dir, prefix=".tmp_" )
+        for name, x in arrays.items():
+            np.save( os.path.join( tmp, name + ".npy" ), x )
+        try:
+            os.rename( tmp, path )
+        except OSError: # the same entry was stored by someone else meanwhile
+            shutil.rmtree( tmp, ignore_errors=True )
+        self.evict( keep=path )
+
+    def evict( self, keep=None ):
+        entries = []
+        for name in os.listdir( self.cache_dir ):
+            path = os.path.join( self.cache_dir, name )
+            if( name.startswith( "." ) or not os.path.isdir( path ) ):
+                continue
+            size = sum( os.path.getsize( os.path.join( path, f ) ) for f in os.listdir( path ) )
+            entries.append( ( os.path.getmtime( path ), size, path ) )
+        total = sum( e[1] for e in entries )
+        for mtime, size, path in sorted( entries ):
+            if( total <= self.max_bytes ):
+                break
+            if( path == keep ):
+                continue
+            shutil.rmtree( path, ignore_errors=True )
+            total -= size
+
+    # generate() uses globals of its script, so the whole script goes to the key
+    def __call__( self, params, generate ):
+        params = dict( params, script=file_hash( inspect.getsourcefile( generate ) ) )
+        arrays = self.get( params )
+        if( arrays is not None ):
+            return arrays
+        self.put( params, generate() )
+        return self.get( params )
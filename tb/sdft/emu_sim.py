@@ -0,0 +1,93 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+# Simulator stand-in running ../../python/sdft_default_emu.py instead of vsim
+# for ARCHITECTURE="default":
+#
+#   SIM="python3 emu_sim.py" python3 test.py
+#   SIM="python3 emu_sim.py" python3 sweep.py
+#
+# Reads parameters.v and vectors written by test.py, feeds the stimulus to the
+# emulator configured as the DUT in tb.sv and scores its valid_o stream
+# against the reference the way tb.sv scoreboard does. Writes score.txt as
+# make.tcl does it ({ } around the score string)
+
+import os
+import re
+import sys
+import numpy as np
+TB_DIR = os.path.dirname( os.path.abspath( __file__ ) )
+sys.path.append( TB_DIR + "/../../python/")
+from sdft_default_emu import SdftDefaultEmu
+from sdft_default_emu import tb_period
+from utility_functions import read_vector
+
+params = {}
+for line in open( "parameters.v" ):
+    m = re.match( r'\s*parameter\s+(\w+)\s*=\s*"?([^";]*)"?;', line )
+    if( m ):
+        params[m.group(1)] = m.group(2)
+
+if( params["ARCHITECTURE"] != "default" ):
+    print( f"emu_sim : only \"default\" architecture is emulated, not \"{params['ARCHITECTURE']}\"" )
+    sys.exit( 1 )
+
+DW  = int( params["DATA_WIDTH"] )
+OW  = DW*2 # IDW in tb.sv
+fmt = params.get( "VECTOR_FORMAT", "text" )
+
+x      = read_vector( params["TEST_DATA_FNAME"],   DW, fmt )
+ref_re = read_vector( params["REF_DATA_RE_FNAME"], OW, fmt )
+ref_im = read_vector( params["REF_DATA_IM_FNAME"], OW, fmt )
+
+emu = SdftDefaultEmu( int( params["RADIX"] ), DW=DW, CW=int( params["COEFFICIENT_WIDTH"] ),
+                      IDW=OW, HANNING_EN=int( params["HANNING_EN"] ),
+                      FIX_EN=1, FIX=2**(DW-1)-1,
+                      period=tb_period( int( params["CLK_PER_SAMPLE"] ) ) )
+out = emu.run( x )
+
+n        = min( len( out["re"] ), len( ref_re ), len( ref_im ) )
+error_re = ref_re[:n] - out["re"][:n]
+error_im = ref_im[:n] - out["im"][:n]
+
+def nmse_str( err, reference ):
+    if( err == 0 ):
+        return "? (empty error accumulator)"
+    if( reference == 0 ):
+        return "? (empty reference accumulator)"
+    return "%f" % ( 10.0 * np.log10( err / reference ) )
+
+# Python ints, the accumulators don't overflow
+nmse_re = nmse_str( int( np.sum( error_re.astype( object )**2 ) ), int( np.sum( ref_re[:n].astype( object )**2 ) ) )
+nmse_im = nmse_str( int( np.sum( error_im.astype( object )**2 ) ), int( np.sum( ref_im[:n].astype( object )**2 ) ) )
+peak_re = 100 * np.abs( error_re ).max( initial=0 ) / 2**OW
+peak_im = 100 * np.abs( error_im ).max( initial=0 ) / 2**OW
+
+f = open( "score.txt", "w" )
+f.write( "{%d samples processed, nmse (im/re): %s / %s dB, peak error (im/re): %f / %f  %%}\n" %
+         ( n, nmse_im, nmse_re, peak_im, peak_re ) )
+f.close()
+print( f"emu_sim : {len( out['re'] )} outputs, sat_alarm clocks {out['sat_alarm'].sum()}" )
@@ -0,0 +1,66 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+# Simulator stand-in to check test.py / sweep.py without vsim:
+#
+#   SIM="python3 stub_sim.py" python3 sweep.py
+#
+# Checks that everything vsim -do make.tcl needs is in cwd (parameters.v,
+# files with existing RTL sources, twiddles, test and reference vectors) and
+# writes score.txt the way make.tcl does it ({ } around the tb.sv score
+# string). Samples count is the real reference length, NMSE and peak error are
+# fake numbers derived from the parameters.
+
+import os
+import re
+import sys
+
+params = {}
+for line in open( "parameters.v" ):
+    m = re.match( r'\s*parameter\s+(\w+)\s*=\s*"?([^";]*)"?;', line )
+    if( m ):
+        params[m.group(1)] = m.group(2)
+
+for fname in [ line.strip() for line in open( "files" ) if line.strip() ] + \
+             [ "sdft_twiddles.mem", params["TEST_DATA_FNAME"],
+               params["REF_DATA_RE_FNAME"], params["REF_DATA_IM_FNAME"] ]:
+    if( not os.path.isfile( fname ) ):
+        print( f"stub_sim : {fname} doesn't exist" )
+        sys.exit( 1 )
+
+ref = params["REF_DATA_RE_FNAME"]
+if( params.get( "VECTOR_FORMAT", "text" ) == "binary" ):
+    samples = os.path.getsize( ref ) // ( 4 if( 2*int( params["DATA_WIDTH"] ) <= 32 ) else 8 )
+else:
+    samples = sum( 1 for line in open( ref ) if line.strip() )
+
+nmse = -6.02 * int( params["COEFFICIENT_WIDTH"] ) + ( 3.0 if( params["ARCHITECTURE"]=="rl" ) else 0.0 )
+peak = 100.0 / 2**( int( params["DATA_WIDTH"] ) - 1 )
+
+f = open( "score.txt", "w" )
+f.write( "{%d samples processed, nmse (im/re): %f / %f dB, peak error (im/re): %f / %f  %%}\n" %
+         ( samples, nmse, nmse, peak, peak ) )
+f.close()
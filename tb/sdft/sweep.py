@@ -0,0 +1,124 @@
+#!bin/pythion3
+#
+# MIT License
+#
+# Copyright (c) 2024 Dmitriy Nekrasov
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ---------------------------------------------------------------------------------
+#
+# Runs test.py over the grid of parameters below. Every point gets its own
+# scratch directory (test.py writes all the generated files and the simulator
+# works in cwd), so points run in parallel on a process pool. score.txt of
+# every point is parsed into RESULTS_FNAME (CSV), one row per point.
+#
+#   python3 sweep.py
+#   SIM="python3 stub_sim.py" python3 sweep.py # no simulator, checks the flow
+#
+# SIM is the simulator command run in the scratch directory, tb.sv and
+# make.tcl are copied there. Scratch directories of failed points are kept.
+
+import os
+import re
+import sys
+import csv
+import time
+import shutil
+import tempfile
+import itertools
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+TB_DIR = os.path.dirname( os.path.abspath( __file__ ) )
+
+############################################################################
+# Sweep parameters
+
+GRID = {
+  "RADIX"             : [ 64, 256 ],
+  "DATA_WIDTH"        : [ 16 ],
+  "COEFFICIENT_WIDTH" : [ 12, 16 ],
+  "HANNING_EN"        : [ 0, 1 ],
+  "ARCHITECTURE"      : [ "default", "rl" ]
+}
+SIM           = os.environ.get( "SIM", "vsim -c -do make.tcl" )
+# Relative SIM arguments (stub_sim.py) are resolved against this directory
+SIM           = " ".join( os.path.join( TB_DIR, a ) if( a.endswith( ".py" ) ) else a
+                          for a in SIM.split() )
+WORKERS       = int( os.environ.get( "WORKERS", os.cpu_count() ) )
+SCRATCH_DIR   = os.environ.get( "SCRATCH_DIR", tempfile.gettempdir() )
+RESULTS_FNAME = os.environ.get( "RESULTS_FNAME", "sweep_results.csv" )
+# Files test.py needs in cwd besides the generated ones
+TB_FILES      = [ "tb.sv", "make.tcl" ]
+
+FIELDS = list( GRID ) + [ "status", "samples", "nmse_re", "nmse_im",
+                          "peak_error_re", "peak_error_im", "seconds", "scratch" ]
+
+SCORE_RE = re.compile( r"\{?\s*(\d+) samples processed, nmse \(im/re\): (.*) / (.*) dB, "
+                       r"peak error \(im/re\): (\S+) / (\S+)\s*%?\}?" )
+
+############################################################################
+
+# nmse could be "? (empty error accumulator)", it goes as is
+def parse_score( fname ):
+    try:
+        line = open( fname ).readline().strip()
+    except FileNotFoundError:
+        return None
+    m = SCORE_RE.match( line )
+    if( not m ):
+        return None
+    return { "samples"       : int( m.group(1) ),
+             "nmse_im"       : m.group(2),
+             "nmse_re"       : m.group(3),
+             "peak_error_im" : float( m.group(4) ),
+             "peak_error_re" : float( m.group(5) ) }
+
+def run_point( point ):
+    scratch = tempfile.mkdtemp( dir=SCRATCH_DIR, prefix="sdft_sweep_" )
+    for f in TB_FILES:
+        shutil.copy( os.path.join( TB_DIR, f ), scratch )
+    env = dict( os.environ, **{ k : str(v) for k, v in point.items() } )
+    env.update( { "SIM" : SIM, "TESTBENCH_MODE" : "automatic", "CLEAN" : "0", "WORKERS" : "1" } )
+    t0  = time.perf_counter()
+    res = subprocess.run( [ sys.executable, os.path.join( TB_DIR, "test.py" ) ],
+                          cwd=scratch, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT )
+    row = dict( point, seconds="%.1f" % ( time.perf_counter() - t0 ), scratch="" )
+    score = parse_score( os.path.join( scratch, "score.txt" ) )
+    if( res.returncode != 0 or score is None ):
+        open( os.path.join( scratch, "sweep.log" ), "wb" ).write( res.stdout )
+        row.update( status="failed", scratch=scratch )
+    else:
+        row.update( score, status="ok" )
+        shutil.rmtree( scratch, ignore_errors=True )
+    return row
+
+if __name__ == "__main__":
+    points = [ dict( zip( GRID, values ) ) for values in itertools.product( *GRID.values() ) ]
+    print( f"{len(points)} points, {WORKERS} workers, SIM: {SIM}" )
+    f = open( RESULTS_FNAME, "w", newline="" )
+    w = csv.DictWriter( f, FIELDS )
+    w.writeheader()
+    with ProcessPoolExecutor( WORKERS ) as pool:
+        for row in pool.map( run_point, points ):
+            w.writerow( row )
+            f.flush()
+            print( " ".join( f"{k}={row.get(k,'')}" for k in FIELDS if row.get(k,'') != '' ) )
+    f.close()
@@ -35,28 +35,49 @@ import numpy as np
 import sys
 import os
 import subprocess
-cwd = os.getcwd()
-sys.path.append( cwd + "/../../python/")
+# All generated files go to cwd, sources are found relative to this script, so
+# it could be run from any (scratch) directory, see sweep.py
+TB_DIR = os.path.dirname( os.path.abspath( __file__ ) )
+sys.path.append( TB_DIR + "/../../python/")
 from models import SdftInt
 from models import SdftIntRL
+from parallel_reference import parallel_reference
+from sdft_default_emu import align
 from utility_functions import twiddle_generator_int
 from utility_functions import twiddles_to_mem
+from utility_functions import write_vector
+from vector_cache import VectorCache
 
 ############################################################################
 # Test parameters (example)
 
+# Parameters below could be overridden by environment variables of the same
+# name, that's how sweep.py runs this script
+env = lambda name, default : type(default)( os.environ.get( name, default ) )
+
 # Mandatory parameters
-RADIX                    = 256
-DATA_WIDTH               = 16
-COEFFICIENT_WIDTH        = 16
-HANNING_EN               = 0
-ARCHITECTURE             = ( "default", "rl" )[1]
+RADIX                    = env( "RADIX",             256 )
+DATA_WIDTH               = env( "DATA_WIDTH",        16 )
+COEFFICIENT_WIDTH        = env( "COEFFICIENT_WIDTH", 16 )
+HANNING_EN               = env( "HANNING_EN",        0 )
+ARCHITECTURE             = env( "ARCHITECTURE",      ( "default", "rl" )[1] )
 CLK_PER_SAMPLE           = RADIX+1
-TESTBENCH_MODE           = ( "manual", "automatic" )[1]
+TESTBENCH_MODE           = env( "TESTBENCH_MODE",    ( "manual", "automatic" )[1] )
+SIM                      = env( "SIM",               "vsim -c -do make.tcl" ) # or "python3 emu_sim.py"
+CLEAN                    = env( "CLEAN",             1 ) # remove generated files after the run
 TWIDDLE_ROM_FILE         = "sdft_twiddles.mem"
+VECTOR_FORMAT            = ( "text", "binary" )[1]
+VECTOR_EXT               = ".txt" if( VECTOR_FORMAT=="text" ) else ".bin"
+TEST_DATA_FNAME          = "input" + VECTOR_EXT
+REF_DATA_RE_FNAME        = "ref_data_re" + VECTOR_EXT
+REF_DATA_IM_FNAME        = "ref_data_im" + VECTOR_EXT
+WORKERS                  = env( "WORKERS", 1 ) # reference model processes, bins are split between them
+# None (default) gives new stimulus every run, no caching then. A fixed seed
+# (e.g. SEED=1 in environment) repeats the stimulus and reuses cached vectors
+SEED                     = int( os.environ["SEED"] ) if( "SEED" in os.environ ) else None
 
 # Could be static if project has fixed RTL files set
-RTL_SOURCES = [
+RTL_SOURCES = [ os.path.join( TB_DIR, f ) for f in [
   '../../rtl/sat.sv',
   '../../rtl/ram.sv',
   '../../rtl/rom.sv',
@@ -65,7 +86,7 @@ RTL_SOURCES = [
   '../../rtl/sdft_default.sv',
   '../../rtl/sdft_rl.sv',
   '../../rtl/sdft.sv'
-]
+] ]
 
 ############################################################################
 # Translate config to verilog
@@ -77,9 +98,10 @@ f.write(f"parameter RADIX             = {RADIX};\n")
 f.write(f"parameter HANNING_EN        = {HANNING_EN};\n")
 f.write(f'parameter ARCHITECTURE      = "{ARCHITECTURE}";\n')
 f.write(f'parameter CLK_PER_SAMPLE    = {CLK_PER_SAMPLE};\n')
-f.write(f'parameter TEST_DATA_FNAME   = "input.txt";\n')
-f.write(f'parameter REF_DATA_RE_FNAME = "ref_data_re.txt";\n')
-f.write(f'parameter REF_DATA_IM_FNAME = "ref_data_im.txt";\n')
+f.write(f'parameter TEST_DATA_FNAME   = "{TEST_DATA_FNAME}";\n')
+f.write(f'parameter REF_DATA_RE_FNAME = "{REF_DATA_RE_FNAME}";\n')
+f.write(f'parameter REF_DATA_IM_FNAME = "{REF_DATA_IM_FNAME}";\n')
+f.write(f'parameter VECTOR_FORMAT     = "{VECTOR_FORMAT}";\n')
 f.write(f'parameter TESTBENCH_MODE    = "{TESTBENCH_MODE}";\n')
 f.close()
 
@@ -103,38 +125,43 @@ min_val = -2**(DATA_WIDTH-1)
 max_val =  2**(DATA_WIDTH-1)-1
 sigma   = max_val / 8
 
-rng = np.random.default_rng()
-test_data = np.clip( rng.normal( 0.0, sigma, N ), min_val, max_val )
-
 if( ARCHITECTURE=="default" ):
-    sdft = SdftInt( RADIX, bitwidth=DATA_WIDTH, hanning_en=(HANNING_EN==1) )
+    model = SdftInt
 else:
-    sdft = SdftIntRL( RADIX, bitwidth=DATA_WIDTH, hanning_en=(HANNING_EN==1) )
+    model = SdftIntRL
 
-reference_data = np.array( [sdft(test_data[i]) for i in range(N) ] )
+def generate():
+    rng = np.random.default_rng( SEED )
+    test_data = np.clip( rng.normal( 0.0, sigma, N ), min_val, max_val )
+    reference_data = parallel_reference( model, RADIX, test_data, WORKERS,
+                                         bitwidth=DATA_WIDTH, hanning_en=(HANNING_EN==1) )
+    return { "test_data" : test_data, "reference_data" : reference_data }
+
+if( SEED is None ):
+    vectors = generate()
+else:
+    vectors = VectorCache()( { "model"             : model.__name__,
+                               "RADIX"             : RADIX,
+                               "DATA_WIDTH"        : DATA_WIDTH,
+                               "COEFFICIENT_WIDTH" : COEFFICIENT_WIDTH,
+                               "HANNING_EN"        : HANNING_EN,
+                               "ARCHITECTURE"      : ARCHITECTURE,
+                               "SEED"              : SEED,
+                               "N"                 : N }, generate )
+test_data      = vectors["test_data"]
+reference_data = vectors["reference_data"]
 
 if( ARCHITECTURE=="default" ):
-    # The first block is empty because of 1 block cycle delay. Insert this empty
-    # output into reference data to emulate dut behaviour
-    reference_data = np.insert( reference_data, 0, np.zeros(RADIX), axis=0 )[:-1]
-
-td  = open( "input.txt", "w" )
-for i in range(N):
-    td.write( "%d\n" % test_data[i] )
-td.close()
-
-rd_re = open( "ref_data_re.txt", "w" )
-rd_im = open( "ref_data_im.txt", "w" )
-for i in range(N):
-    for j in range(RADIX):
-        rd_re.write( "%d\n" % reference_data[i,j].real )
-        rd_im.write( "%d\n" % reference_data[i,j].imag )
-rd_re.close()
-rd_im.close()
+    # DUT outputs every spectrum one block later, the first block is empty
+    reference_data = align( reference_data )
+
+# Output width of the DUT is IDW = DATA_WIDTH*2 (see tb.sv)
+write_vector( TEST_DATA_FNAME,   test_data,           DATA_WIDTH,   VECTOR_FORMAT )
+write_vector( REF_DATA_RE_FNAME, reference_data.real, DATA_WIDTH*2, VECTOR_FORMAT )
+write_vector( REF_DATA_IM_FNAME, reference_data.imag, DATA_WIDTH*2, VECTOR_FORMAT )
 
 if( TESTBENCH_MODE == "automatic" ):
-    run_vsim = "vsim -c -do make.tcl"
-    vsim = subprocess.Popen( run_vsim.split(), stdout=subprocess.PIPE )
+    vsim = subprocess.Popen( SIM.split(), stdout=subprocess.PIPE )
     res = vsim.communicate()
     print(res)
     try:
@@ -145,24 +172,27 @@ if( TESTBENCH_MODE == "automatic" ):
         score = "No score.txt were generated by make.tcl routine"
     f = open( "log", "a" )
     f.write("------------------------------------------------------------\n")
-    f.write( f"Paramters: .... ")
+    f.write( f"Paramters: RADIX={RADIX} DATA_WIDTH={DATA_WIDTH} "
+             f"COEFFICIENT_WIDTH={COEFFICIENT_WIDTH} HANNING_EN={HANNING_EN} "
+             f"ARCHITECTURE={ARCHITECTURE} ")
     f.write( f"Results: {score}\n")
     f.close()
     # clean
-    try:
-        os.remove(TWIDDLE_ROM_FILE)
-        os.remove("parameters.v")
-        os.remove("files")
-        os.remove("input.txt")
-        os.remove("ref_data_re.txt")
-        os.remove("ref_data_im.txt")
-        os.remove("score.txt")
-        os.remove("transcript")
-        os.remove("vsim.wlf")
-        import shutil
-        shutil.rmtree( "work", ignore_errors=True )
-    except FileNotFoundError:
-        pass
+    if( CLEAN ):
+        try:
+            os.remove(TWIDDLE_ROM_FILE)
+            os.remove("parameters.v")
+            os.remove("files")
+            os.remove(TEST_DATA_FNAME)
+            os.remove(REF_DATA_RE_FNAME)
+            os.remove(REF_DATA_IM_FNAME)
+            os.remove("score.txt")
+            os.remove("transcript")
+            os.remove("vsim.wlf")
+            import shutil
+            shutil.rmtree( "work", ignore_errors=True )
+        except FileNotFoundError:
+            pass
 
 
 
@@ -70,6 +70,48 @@ initial
 
 //***************************************************************************
 
+// Test and reference vectors come either as text (one decimal number per
+// line) or binary (fixed-width little-endian integers, 4 bytes per value up
+// to 32 bits wide, 8 above), see VECTOR_FORMAT and write_vector() in
+// ../../python/utility_functions.py
+localparam IN_BYTES  = DATA_WIDTH   > 32 ? 8 : 4;
+localparam REF_BYTES = OUTPUT_WIDTH > 32 ? 8 : 4;
+
+function automatic int open_vector( string fname );
+  return $fopen( fname, VECTOR_FORMAT=="binary" ? "rb" : "r" );
+endfunction
+
+// Returns 0 when there is nothing to read, value keeps the old one then
+function automatic int read_value( int f, int bytes, inout longint value );
+  string       str;
+  logic [31:0] raw32;
+  logic [63:0] raw64;
+  if( VECTOR_FORMAT != "binary" )
+    begin
+      void'( $fgets( str, f ) );
+      if( str=="" )
+        return 0;
+      value = $signed(str.atoi());
+      return 1;
+    end
+  if( bytes == 4 )
+    begin
+      if( $fread( raw32, f ) != 4 )
+        return 0;
+      raw32 = {<<8{raw32}}; // $fread puts the first byte to MSBs
+      value = $signed(raw32);
+    end
+  else
+    begin
+      if( $fread( raw64, f ) != 8 )
+        return 0;
+      raw64 = {<<8{raw64}};
+      value = $signed(raw64);
+    end
+  return 1;
+endfunction
+
+
 task automatic init_input( );
   input_valid <= 0;
   data_i      <= 'x;
@@ -86,19 +128,18 @@ endfunction
 
 task automatic driver ();
   int f;
-  string data_str;
-  f = $fopen( TEST_DATA_FNAME, "r" );
+  longint value;
+  f = open_vector( TEST_DATA_FNAME );
   if( !f )
     $fatal( "can't open file with test data" );
   while( !$feof( f ) )
     begin
-      $fgets( data_str, f );
-      if( data_str=="" )
+      if( !read_value( f, IN_BYTES, value ) )
         begin
           init_input();
           break;
         end
-      data_i      <= $signed(data_str.atoi());
+      data_i      <= value;
       input_valid <= 1;
       @( posedge clk );
       if( CLK_PER_SAMPLE > 1 )
@@ -118,13 +159,13 @@ event ev;
 
 task automatic monitor();
   int f;
-  string str;
-  f = $fopen( REF_DATA_FNAME, "r" );
+  longint value;
+  f = open_vector( REF_DATA_FNAME );
   if( !f )
     $fatal( "can't open file with reference data" );
   // Put first sample on wires before entering the loop
-  $fgets( str, f );
-  reference_data = $signed(str.atoi());
+  void'( read_value( f, REF_BYTES, value ) );
+  reference_data = value;
   while( !( $feof( f ) | stop_flag ) )
     begin
       if( output_valid === 1'b1 )
@@ -134,10 +175,9 @@ task automatic monitor();
                @( posedge clk );
                $fatal( "\n\n\nX-states were found at the output, exiting\n\n\n" );
              end
-          $fgets( str, f );
-          if( str=="" )
+          if( !read_value( f, REF_BYTES, value ) )
             break;
-          reference_data = $signed(str.atoi());
+          reference_data = value;
         end
       @( posedge clk );
     end
@@ -37,9 +37,12 @@ import os
 import subprocess
 cwd = os.getcwd()
 sys.path.append( cwd + "/../../python/")
-from sdft import SdftIntReal
+from models import SdftIntReal
+from parallel_reference import parallel_reference
 from utility_functions import twiddle_generator_int
 from utility_functions import twiddles_to_mem
+from utility_functions import write_vector
+from vector_cache import VectorCache
 
 ############################################################################
 # Test parameters (example)
@@ -52,8 +55,12 @@ HANNING_EN               = 0
 CLK_PER_SAMPLE           = RADIX//2+1
 TESTBENCH_MODE           = ( "manual", "automatic" )[0]
 TWIDDLE_ROM_FILE         = "sdft_twiddles.mem"
-TEST_DATA_FNAME          = "input.txt"
-REF_DATA_FNAME           = "ref.txt"
+VECTOR_FORMAT            = ( "text", "binary" )[1]
+VECTOR_EXT               = ".txt" if( VECTOR_FORMAT=="text" ) else ".bin"
+TEST_DATA_FNAME          = "input" + VECTOR_EXT
+REF_DATA_FNAME           = "ref" + VECTOR_EXT
+WORKERS                  = 1 # reference model processes, bins are split between them
+SEED                     = None # new stimulus every run; a fixed seed repeats it and reuses cached vectors
 
 # Could be static if project has fixed RTL files set
 RTL_SOURCES = [
@@ -76,6 +83,7 @@ f.write(f"parameter HANNING_EN        = {HANNING_EN};\n")
 f.write(f'parameter CLK_PER_SAMPLE    = {CLK_PER_SAMPLE};\n')
 f.write(f'parameter TEST_DATA_FNAME   = "{TEST_DATA_FNAME}";\n')
 f.write(f'parameter REF_DATA_FNAME    = "{REF_DATA_FNAME}";\n')
+f.write(f'parameter VECTOR_FORMAT     = "{VECTOR_FORMAT}";\n')
 f.write(f'parameter TESTBENCH_MODE    = "{TESTBENCH_MODE}";\n')
 f.close()
 
@@ -99,27 +107,34 @@ min_val = -2**(DATA_WIDTH-1)
 max_val =  2**(DATA_WIDTH-1)-1
 sigma   = max_val / 8
 
-rng = np.random.default_rng()
-test_data = np.clip( rng.normal( 0.0, sigma, N ), min_val, max_val )
-
-sdft = SdftIntReal( RADIX, bitwidth=DATA_WIDTH, hanning_en=(HANNING_EN==1) )
-
-reference_data = np.array( [sdft(test_data[i]) for i in range(N) ] )
+def generate():
+    rng = np.random.default_rng( SEED )
+    test_data = np.clip( rng.normal( 0.0, sigma, N ), min_val, max_val )
+    reference_data = parallel_reference( SdftIntReal, RADIX, test_data, WORKERS,
+                                         bitwidth=DATA_WIDTH, hanning_en=(HANNING_EN==1) )
+    return { "test_data" : test_data, "reference_data" : reference_data }
+
+if( SEED is None ):
+    vectors = generate()
+else:
+    vectors = VectorCache()( { "model"             : "SdftIntReal",
+                               "RADIX"             : RADIX,
+                               "DATA_WIDTH"        : DATA_WIDTH,
+                               "COEFFICIENT_WIDTH" : COEFFICIENT_WIDTH,
+                               "HANNING_EN"        : HANNING_EN,
+                               "ARCHITECTURE"      : "default",
+                               "SEED"              : SEED,
+                               "N"                 : N }, generate )
+test_data      = vectors["test_data"]
+reference_data = vectors["reference_data"]
 
 # The first block is empty because of 1 block cycle delay. Insert this empty
 # output into reference data to emulate dut behaviour
 reference_data = np.insert( reference_data, 0, np.zeros(RADIX//2), axis=0 )[:-1]
 
-td  = open( TEST_DATA_FNAME, "w" )
-for i in range(N):
-    td.write( "%d\n" % test_data[i] )
-td.close()
-
-rd_re = open( REF_DATA_FNAME, "w" )
-for i in range(N):
-    for j in range(RADIX//2):
-        rd_re.write( "%d\n" % reference_data[i,j] )
-rd_re.close()
+# Output width of the DUT is IDW = DATA_WIDTH*2 (see tb.sv)
+write_vector( TEST_DATA_FNAME, test_data,      DATA_WIDTH,   VECTOR_FORMAT )
+write_vector( REF_DATA_FNAME,  reference_data, DATA_WIDTH*2, VECTOR_FORMAT )
 
 if( TESTBENCH_MODE == "automatic" ):
     run_vsim = "vsim -c -do make.tcl"
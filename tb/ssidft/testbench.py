@@ -41,6 +41,7 @@ from models import SdftInt
 from models import SsidftInt
 from utility_functions import twiddle_generator_int
 from utility_functions import twiddles_to_mem
+from vector_cache import VectorCache
 
 ############################################################################
 # Test parameters (example)
@@ -53,6 +54,7 @@ HANNING_EN               = 0
 CLK_PER_SAMPLE           = RADIX+1
 TESTBENCH_MODE           = ( "manual", "automatic" )[0]
 TWIDDLE_ROM_FILE         = "sdft_twiddles.mem"
+SEED                     = 123 # None gives new stimulus every run, no caching then
 
 # Could be static if project has fixed RTL files set
 RTL_SOURCES = [
@@ -80,20 +82,40 @@ f.close()
 ############################################################################
 # Prepare test data
 
-N = RADIX * 10
+N     = RADIX * 10
+CHUNK = 4096 # samples per SDFT -> SSIDFT step
 
 min_val = -2**(DATA_WIDTH-1)
 max_val =  2**(DATA_WIDTH-1)-1
 sigma   = max_val / 4
 
-rng = np.random.default_rng(seed=123)
-test_data = np.clip( rng.normal( 0.0, sigma, N ), min_val, max_val )
-
-sdft   = SdftInt( RADIX, bitwidth=DATA_WIDTH, hanning_en=(HANNING_EN==1) )
-ssidft = SsidftInt( RADIX )
-
-freq_domain_data = np.array([ sdft(test_data[i])        for i in range(N) ])
-reference_data = np.array([ ssidft(freq_domain_data[i]) for i in range(N) ])
+def generate():
+    rng = np.random.default_rng( SEED )
+    test_data = np.clip( rng.normal( 0.0, sigma, N ), min_val, max_val )
+
+    sdft   = SdftInt( RADIX, bitwidth=DATA_WIDTH, hanning_en=(HANNING_EN==1) )
+    ssidft = SsidftInt( RADIX )
+
+    # Spectrogram is produced and consumed by chunks, never stored in full
+    reference_data = np.zeros( N, dtype=np.int64 )
+    for t in range( 0, N, CHUNK ):
+        freq_domain_data = sdft.process( test_data[t:t+CHUNK] )
+        reference_data[t:t+CHUNK] = ssidft.process( freq_domain_data )
+    return { "test_data" : test_data, "reference_data" : reference_data }
+
+if( SEED is None ):
+    vectors = generate()
+else:
+    vectors = VectorCache()( { "model"             : "SsidftInt",
+                               "RADIX"             : RADIX,
+                               "DATA_WIDTH"        : DATA_WIDTH,
+                               "COEFFICIENT_WIDTH" : COEFFICIENT_WIDTH,
+                               "HANNING_EN"        : HANNING_EN,
+                               "ARCHITECTURE"      : "default",
+                               "SEED"              : SEED,
+                               "N"                 : N }, generate )
+test_data      = vectors["test_data"]
+reference_data = vectors["reference_data"]
 
 
 td = open( "input.txt", "w" )
@@ -27,9 +27,12 @@
 # A script to generate twiddle ROM memory image (Verilog .mem format). The
 # parameters (UPPERCASE variables) are self-describing.
 #
-# XXX: This is not the optimal way to store twiddles, because one quarter of
-# sine wave in memory + some trivial arithmetics to select proper quadrant and
-# turn sine into cosine if needed would be enough. Anyway, the work in this
+# MODE="full" is the table ../rtl/sdft.sv reads: RADIX words of { im, re },
+# BITWIDTH*2 bits. MODE="quarter" stores only one quarter of sine wave:
+# RADIX/4 unsigned BITWIDTH bit words, 8 times less bits. Some trivial
+# arithmetics selects proper quadrant and turns sine into cosine, see
+# quarter_wave_twiddles() in python/utility_functions.py, which is the model of
+# this logic and reproduces the full table exactly. Anyway, the work in this
 # repo doesn't focus on optimal twiddle generation, only gives a basic solution.
 # I would suggest to use my coric-based sine/cosine generator to produce
 # twiddles:
@@ -39,11 +42,29 @@
 import numpy as np
 from python.utility_functions import twiddle_generator_int
 from python.utility_functions import twiddles_to_mem
+from python.utility_functions import quarter_wave_rom
+from python.utility_functions import quarter_wave_twiddles
+from python.utility_functions import quarter_wave_to_mem
 
 RADIX    = 2**12
 BITWIDTH = 18
 ORDER    = ("forward", "inverse")[1]
-FNAME    = f"twiddles_{BITWIDTH}b_{RADIX}.mem"
+MODE     = ("full", "quarter")[0]
 
-w = twiddle_generator_int( RADIX, ORDER, BITWIDTH )
-twiddles_to_mem( FNAME, w, BITWIDTH )
+if( MODE == "full" ):
+    FNAME = f"twiddles_{BITWIDTH}b_{RADIX}.mem"
+    w = twiddle_generator_int( RADIX, ORDER, BITWIDTH )
+    twiddles_to_mem( FNAME, w, BITWIDTH )
+else:
+    # Order doesn't matter for the ROM, only for the quadrant logic
+    FNAME = f"twiddles_quarter_{BITWIDTH}b_{RADIX}.mem"
+    rom = quarter_wave_rom( RADIX, BITWIDTH )
+    # twiddle_generator_int() rounds every sin/cos directly, independent of
+    # the quadrant logic model
+    model = quarter_wave_twiddles( rom, RADIX, ORDER, BITWIDTH )
+    ref   = twiddle_generator_int( RADIX, ORDER, BITWIDTH )
+    if( not np.array_equal( model, ref ) ):
+        print( "Quarter-wave ROM doesn't reproduce the full twiddle table, "
+               "%d words differ" % np.count_nonzero( model != ref ) )
+        exit()
+    quarter_wave_to_mem( FNAME, rom, BITWIDTH )